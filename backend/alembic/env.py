@@ -3,7 +3,7 @@ import os
 from logging.config import fileConfig
 
 from dotenv import load_dotenv
-from sqlalchemy import pool
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
@@ -12,10 +12,6 @@ from alembic import context
 # 👉 ОБЯЗАТЕЛЬНО загружаем .env
 load_dotenv()
 
-# Import your models (ВАЖНО: импортировать модули)
-from app.database import Base
-from app.models import user, generation, transaction, referral, payment, withdrawal
-
 # Alembic Config
 config = context.config
 
@@ -26,14 +22,10 @@ if not database_url:
     raise RuntimeError("❌ DATABASE_URL is not set")
 
 # Railway иногда отдаёт postgres:// — чиним
-if database_url.startswith("postgres://"):
-    database_url = database_url.replace(
-        "postgres://", "postgresql+asyncpg://", 1
-    )
-elif database_url.startswith("postgresql://"):
-    database_url = database_url.replace(
-        "postgresql://", "postgresql+asyncpg://", 1
-    )
+for prefix in ("postgres://", "postgresql://"):
+    if database_url.startswith(prefix):
+        database_url = "postgresql+asyncpg://" + database_url[len(prefix):]
+        break
 
 # Передаём Alembic
 config.set_main_option("sqlalchemy.url", database_url)
@@ -42,8 +34,17 @@ config.set_main_option("sqlalchemy.url", database_url)
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# Metadata для autogenerate
-target_metadata = Base.metadata
+# Metadata для autogenerate (загружается лениво, см. _get_metadata)
+target_metadata = None
+
+
+def _get_metadata():
+    """Import app models only when a migration actually runs."""
+    # Import your models (ВАЖНО: импортировать модули)
+    from app.database import Base
+    from app.models import user, generation, transaction, referral, payment, withdrawal
+
+    return Base.metadata
 
 
 def run_migrations_offline() -> None:
@@ -51,7 +52,7 @@ def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
-        target_metadata=target_metadata,
+        target_metadata=_get_metadata(),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -63,7 +64,7 @@ def run_migrations_offline() -> None:
 def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
-        target_metadata=target_metadata,
+        target_metadata=_get_metadata(),
     )
 
     with context.begin_transaction():
@@ -75,7 +76,15 @@ async def run_async_migrations() -> None:
     connectable = async_engine_from_config(
         config.get_section(config.config_ini_section),
         prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
+        # One warm connection reused for every DDL statement instead of a
+        # fresh connect/auth handshake per checkout
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_pre_ping=False,
+        # DDL runs once; don't spend a prepare round-trip caching it, neither
+        # in asyncpg itself nor in SQLAlchemy's asyncpg adapter
+        connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0},
     )
 
     async with connectable.connect() as connection:
@@ -85,7 +94,25 @@ async def run_async_migrations() -> None:
 
 
 def run_migrations_online() -> None:
-    asyncio.run(run_async_migrations())
+    """
+    Run migrations in online mode.
+
+    If the caller already holds a connection (programmatic use, e.g. several
+    alembic commands driven from one event loop), reuse it instead of
+    spinning up a new loop and engine per command:
+
+        def _upgrade(connection):
+            cfg.attributes["connection"] = connection
+            command.upgrade(cfg, "head")
+
+        async with engine.begin() as conn:
+            await conn.run_sync(_upgrade)
+    """
+    connection = config.attributes.get("connection")
+    if connection is None:
+        asyncio.run(run_async_migrations())
+    else:
+        do_run_migrations(connection)
 
 
 if context.is_offline_mode():
@@ -42,8 +42,8 @@ def upgrade() -> None:
         sa.Column('last_active_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
         sa.PrimaryKeyConstraint('id'),
     )
-    op.create_index('ix_users_id', 'users', ['id'])
-    op.create_index('ix_users_referral_code', 'users', ['referral_code'], unique=True)
+    # No extra indexes: the primary key covers id and the UNIQUE constraint
+    # already indexes referral_code.
 
     # Generations table
     op.create_table(
@@ -64,46 +64,54 @@ def upgrade() -> None:
     op.create_index('ix_withdrawals_status', 'withdrawals', ['status'], unique=False)
 
     # ========== UPDATE USERS TABLE ==========
-    # New referral fields
-    op.add_column('users', sa.Column('referral_total_earned', sa.Integer(), default=0))
-    op.add_column('users', sa.Column('referral_withdrawn', sa.Integer(), default=0))
-    op.add_column('users', sa.Column('referrals_count', sa.Integer(), default=0))
-    op.add_column('users', sa.Column('referrals_active', sa.Integer(), default=0))
-    
-    # Payment card fields
-    op.add_column('users', sa.Column('saved_card_number', sa.String(20), nullable=True))
-    op.add_column('users', sa.Column('saved_card_type', sa.String(10), nullable=True))
-    
-    # Stats
-    op.add_column('users', sa.Column('total_spent_uzs', sa.Integer(), default=0))
-    op.add_column('users', sa.Column('total_spent_credits', sa.Integer(), default=0))
-    
-    # Status
-    op.add_column('users', sa.Column('is_admin', sa.Boolean(), default=False))
-    
-    # Timestamps
-    op.add_column('users', sa.Column('first_payment_at', sa.DateTime(timezone=True), nullable=True))
+    # One ALTER TABLE for all new columns: a single lock acquisition and
+    # catalog update instead of ten. None of them has a default, so this is
+    # metadata-only.
+    op.execute("""
+        ALTER TABLE users
+            ADD COLUMN referral_total_earned INTEGER,
+            ADD COLUMN referral_withdrawn INTEGER,
+            ADD COLUMN referrals_count INTEGER,
+            ADD COLUMN referrals_active INTEGER,
+            ADD COLUMN saved_card_number VARCHAR(20),
+            ADD COLUMN saved_card_type VARCHAR(10),
+            ADD COLUMN total_spent_uzs INTEGER,
+            ADD COLUMN total_spent_credits INTEGER,
+            ADD COLUMN is_admin BOOLEAN,
+            ADD COLUMN first_payment_at TIMESTAMP WITH TIME ZONE
+    """)
 
-    # Rename old columns if they exist (handle migration from old schema)
-    # Try to rename referral_earnings -> referral_total_earned if exists
-    try:
-        op.execute("UPDATE users SET referral_total_earned = COALESCE(referral_earnings, 0) WHERE referral_total_earned IS NULL")
-    except:
-        pass
+    # Carry over referral_earnings -> referral_total_earned (old schema only).
+    # Check the catalog first: a failing UPDATE would abort the transaction.
+    conn = op.get_bind()
+    has_col = conn.execute(sa.text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'users' AND column_name = 'referral_earnings'"
+    )).scalar()
+    if has_col:
+        # One statement: the migration runs in a single transaction, so
+        # batching would hold every batch's row locks until commit anyway
+        conn.execute(sa.text(
+            "UPDATE users SET referral_total_earned = COALESCE(referral_earnings, 0) "
+            "WHERE referral_total_earned IS NULL"
+        ))
 
 
 def downgrade() -> None:
     # Drop new columns from users
-    op.drop_column('users', 'first_payment_at')
-    op.drop_column('users', 'is_admin')
-    op.drop_column('users', 'total_spent_credits')
-    op.drop_column('users', 'total_spent_uzs')
-    op.drop_column('users', 'saved_card_type')
-    op.drop_column('users', 'saved_card_number')
-    op.drop_column('users', 'referrals_active')
-    op.drop_column('users', 'referrals_count')
-    op.drop_column('users', 'referral_withdrawn')
-    op.drop_column('users', 'referral_total_earned')
+    op.execute("""
+        ALTER TABLE users
+            DROP COLUMN first_payment_at,
+            DROP COLUMN is_admin,
+            DROP COLUMN total_spent_credits,
+            DROP COLUMN total_spent_uzs,
+            DROP COLUMN saved_card_type,
+            DROP COLUMN saved_card_number,
+            DROP COLUMN referrals_active,
+            DROP COLUMN referrals_count,
+            DROP COLUMN referral_withdrawn,
+            DROP COLUMN referral_total_earned
+    """)
     
     # Drop tables
     op.drop_index('ix_withdrawals_status', table_name='withdrawals')
@@ -0,0 +1,56 @@
+"""
+Add composite indexes for admin pending queues
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Admin queues filter on status and order by created_at DESC.
+    A (status, created_at DESC) index serves both the filter and the sort,
+    and makes the single-column status indexes redundant.
+
+    payments/withdrawals are live tables by now, so build and drop the
+    indexes CONCURRENTLY (outside the migration transaction) to avoid
+    blocking writes while they run.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_payments_status_created',
+            'payments',
+            ['status', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_payments_status', table_name='payments', postgresql_concurrently=True)
+
+        op.create_index(
+            'ix_withdrawals_status_created',
+            'withdrawals',
+            ['status', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_withdrawals_status', table_name='withdrawals', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Reverse the changes"""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_withdrawals_status', 'withdrawals', ['status'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_withdrawals_status_created', table_name='withdrawals', postgresql_concurrently=True)
+
+        op.create_index('ix_payments_status', 'payments', ['status'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_payments_status_created', table_name='payments', postgresql_concurrently=True)
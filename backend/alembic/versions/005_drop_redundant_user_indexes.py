@@ -0,0 +1,31 @@
+"""
+Drop redundant indexes on users
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 12:00:00
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    ix_users_id duplicates the primary key index and ix_users_referral_code
+    duplicates the index behind the UNIQUE constraint on referral_code.
+    Every insert into users paid for both; drop them.
+    """
+    op.execute("DROP INDEX IF EXISTS ix_users_id")
+    op.execute("DROP INDEX IF EXISTS ix_users_referral_code")
+
+
+def downgrade() -> None:
+    """Reverse the changes"""
+    op.create_index('ix_users_referral_code', 'users', ['referral_code'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'])
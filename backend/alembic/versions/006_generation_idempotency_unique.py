@@ -0,0 +1,67 @@
+"""
+Enforce generation idempotency with a partial unique index
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Replace the plain (user_id, idempotency_key) index with a unique one
+    limited to active generations, so a duplicate submit is rejected by the
+    INSERT itself instead of a racy SELECT beforehand. Finished generations
+    (COMPLETED/FAILED/CANCELLED) and rows without a key stay unconstrained.
+    
+    The old check-then-insert could already have let duplicate active rows
+    in. Those keep running, but all except the newest per key lose their
+    idempotency_key, so the unique build cannot fail on them. The index is
+    built CONCURRENTLY to keep the table writable; if a duplicate still slips
+    in during the build, Postgres leaves the index INVALID and it must be
+    dropped before re-running this revision.
+    """
+    op.execute(
+        """
+        UPDATE generations AS g
+        SET idempotency_key = NULL
+        WHERE g.idempotency_key IS NOT NULL
+          AND g.status IN ('PENDING', 'PROCESSING')
+          AND EXISTS (
+              SELECT 1 FROM generations AS n
+              WHERE n.user_id = g.user_id
+                AND n.idempotency_key = g.idempotency_key
+                AND n.status IN ('PENDING', 'PROCESSING')
+                AND n.id > g.id
+          )
+        """
+    )
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_generations_active_idempotency',
+            'generations',
+            ['user_id', 'idempotency_key'],
+            unique=True,
+            postgresql_where=sa.text(
+                "idempotency_key IS NOT NULL AND status IN ('PENDING', 'PROCESSING')"
+            ),
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_generations_idempotency', 'generations', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Reverse the changes (cleared duplicate keys are not restored)"""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_generations_idempotency', 'generations', ['user_id', 'idempotency_key'], unique=False, postgresql_concurrently=True)
+        op.drop_index('uq_generations_active_idempotency', 'generations', postgresql_concurrently=True)
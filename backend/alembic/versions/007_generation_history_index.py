@@ -0,0 +1,40 @@
+"""
+Add (user_id, created_at DESC, id DESC) index for generation history
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    History is read per user, newest first, with a (created_at, id) keyset
+    cursor. This index serves the filter, the sort and the cursor in one
+    backward-ordered range scan and supersedes the plain user_id index.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_generations_user_created',
+            'generations',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_generations_user_id', table_name='generations', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Reverse the changes"""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_generations_user_id', 'generations', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_generations_user_created', table_name='generations', postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""
+Add (referrer_id, created_at DESC) covering index for the referral list
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 18:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    The partner screen lists a referrer's referrals newest first. This index
+    serves the filter and the sort, carries the referral columns the list
+    reads, and supersedes the plain referrer_id index.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_referrals_referrer_created',
+            'referrals',
+            ['referrer_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_include=['referred_id', 'total_earned'],
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix_referrals_referrer_id', table_name='referrals', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Reverse the changes"""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_referrals_referrer_id', 'referrals', ['referrer_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_referrals_referrer_created', table_name='referrals', postgresql_concurrently=True)
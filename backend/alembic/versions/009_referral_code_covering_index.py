@@ -0,0 +1,41 @@
+"""
+Replace the referral_code UNIQUE constraint with a covering unique index
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 20:00:00
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Referral linking resolves a code to the referrer's id. With id carried
+    in the index that lookup is an index-only scan. The new unique index
+    enforces the same rule, so the constraint (and its index) is dropped
+    rather than maintained twice on every insert.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_referral_code_covering',
+            'users',
+            ['referral_code'],
+            unique=True,
+            postgresql_include=['id'],
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint('users_referral_code_key', 'users', type_='unique')
+
+
+def downgrade() -> None:
+    """Reverse the changes"""
+    op.create_unique_constraint('users_referral_code_key', 'users', ['referral_code'])
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_referral_code_covering', table_name='users', postgresql_concurrently=True)
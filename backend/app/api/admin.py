@@ -2,37 +2,67 @@
 Admin API endpoints
 Handles payment/withdrawal confirmations from Telegram admin channel
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update, func, true
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import asyncio
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.api.deps import require_admin_user
 from app.services.payment import payment_service
 from app.services.telegram import telegram_service
 from app.services.referral import referral_service
+from app.services.cache import cache_service
 from app.models import User, Payment, Withdrawal, PaymentStatus, WithdrawalStatus
 import structlog
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
+# Dashboard aggregates scan whole tables. Serve them from Redis, shared by
+# all workers so one invalidation reaches every worker; keep a day-old copy
+# in Redis as a fallback for when the database is unavailable.
+STATS_REDIS_KEY = "admin:stats:v1"
+STATS_REDIS_TTL = 60  # seconds
+STATS_STALE_KEY = "admin:stats:v1:stale"
+STATS_STALE_TTL = 24 * 60 * 60  # seconds
+
+
+async def _invalidate_stats() -> None:
+    """Drop cached stats after an action changes the counts"""
+    await cache_service.delete(STATS_REDIS_KEY)
+
 
 # ========== SCHEMAS ==========
 
 class PaymentActionRequest(BaseModel):
     payment_id: int
-    admin_id: int
+    admin_id: Optional[int] = None  # identity comes from init_data
     action: str  # "approve" or "reject"
-    reason: Optional[str] = None
+    reason: Optional[str] = Field(None, max_length=200)
 
 
 class WithdrawalActionRequest(BaseModel):
     withdrawal_id: int
-    admin_id: int
+    admin_id: Optional[int] = None  # identity comes from init_data
+    action: str  # "approve" or "reject"
+    reason: Optional[str] = Field(None, max_length=200)
+
+
+class BatchAction(BaseModel):
+    kind: Literal["payment", "withdrawal"]
+    id: int
+    admin_id: Optional[int] = None  # identity comes from init_data
     action: str  # "approve" or "reject"
-    reason: Optional[str] = None
+    reason: Optional[str] = Field(None, max_length=200)
+
+
+class BatchActionRequest(BaseModel):
+    actions: List[BatchAction] = Field(..., min_length=1, max_length=50)
 
 
 class AdminStatsResponse(BaseModel):
@@ -44,11 +74,71 @@ class AdminStatsResponse(BaseModel):
     total_payouts_uzs: int
 
 
+def _ensure_same_admin(admin_id: Optional[int], admin_user: User) -> None:
+    """
+    The admin is identified by the verified init_data (require_admin_user).
+    admin_id is still accepted from older clients, but must match.
+    """
+    if admin_id is not None and admin_id != admin_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+
 # ========== PAYMENT ACTIONS ==========
 
+async def _apply_payment_action(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    admin_id: int,
+    payment_id: int,
+    action: str,
+    reason: Optional[str],
+) -> dict:
+    """Approve or reject a payment and queue the user notifications"""
+    if action == "approve":
+        result = await payment_service.confirm_topup(db, payment_id, admin_id)
+        
+        # Notify user (after the response is sent)
+        background_tasks.add_task(
+            telegram_service.send_payment_confirmed,
+            user_id=result["user_id"],
+            credits=result["credits_added"],
+            new_balance=result["new_balance"],
+        )
+        
+        # Notify referrer about commission if applicable
+        if result.get("commission_info"):
+            commission = result["commission_info"]
+            background_tasks.add_task(
+                telegram_service.send_referral_commission,
+                referrer_id=commission["referrer_id"],
+                referred_name=commission["referred_name"],
+                commission=commission["commission"],
+                new_balance=commission["referrer_new_balance"],
+            )
+        
+        return {"status": "approved", **result}
+        
+    elif action == "reject":
+        result = await payment_service.reject_topup(
+            db, payment_id, admin_id, reason or "Платёж не подтверждён"
+        )
+        
+        # Notify user (after the response is sent)
+        background_tasks.add_task(
+            telegram_service.send_payment_rejected,
+            user_id=result["user_id"],
+            reason=result["reason"],
+        )
+        
+        return {"status": "rejected", **result}
+    
+    raise ValueError("Invalid action")
+
+
 @router.post("/payment/action")
 async def handle_payment_action(
     request: PaymentActionRequest,
+    background_tasks: BackgroundTasks,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -56,62 +146,62 @@ async def handle_payment_action(
     Handle payment approval/rejection from admin channel.
     """
     try:
-        if request.admin_id != admin_user.id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        if request.action == "approve":
-            result = await payment_service.confirm_topup(
-                db, request.payment_id, admin_user.id
-            )
-            
-            # Notify user
-            await telegram_service.send_payment_confirmed(
-                user_id=result["user_id"],
-                credits=result["credits_added"],
-                new_balance=result["new_balance"],
-            )
-            
-            # Notify referrer about commission if applicable
-            if result.get("commission_info"):
-                commission = result["commission_info"]
-                user = await db.get(User, result["user_id"])
-                referrer = await db.get(User, commission["referrer_id"])
-                
-                if referrer:
-                    await telegram_service.send_referral_commission(
-                        referrer_id=referrer.id,
-                        referred_name=user.first_name or user.username or f"User #{user.id}",
-                        commission=commission["commission"],
-                        new_balance=commission["referrer_new_balance"],
-                    )
-            
-            return {"status": "approved", **result}
-            
-        elif request.action == "reject":
-            result = await payment_service.reject_topup(
-                db, request.payment_id, admin_user.id, request.reason or "Платёж не подтверждён"
-            )
-            
-            # Notify user
-            await telegram_service.send_payment_rejected(
-                user_id=result["user_id"],
-                reason=result["reason"],
-            )
-            
-            return {"status": "rejected", **result}
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid action")
-            
+        _ensure_same_admin(request.admin_id, admin_user)
+        result = await _apply_payment_action(
+            db, background_tasks, admin_user.id,
+            request.payment_id, request.action, request.reason,
+        )
+        await _invalidate_stats()
+        return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # ========== WITHDRAWAL ACTIONS ==========
 
+async def _apply_withdrawal_action(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    admin_id: int,
+    withdrawal_id: int,
+    action: str,
+    reason: Optional[str],
+) -> dict:
+    """Approve or reject a withdrawal and queue the user notification"""
+    if action == "approve":
+        result = await payment_service.confirm_withdrawal(db, withdrawal_id, admin_id)
+        
+        # Notify user (after the response is sent)
+        background_tasks.add_task(
+            telegram_service.send_withdrawal_confirmed,
+            user_id=result["user_id"],
+            amount_uzs=result["amount_uzs"],
+        )
+        
+        return {"status": "approved", **result}
+        
+    elif action == "reject":
+        result = await payment_service.reject_withdrawal(
+            db, withdrawal_id, admin_id, reason or "Заявка отклонена"
+        )
+        
+        # Notify user (after the response is sent)
+        background_tasks.add_task(
+            telegram_service.send_withdrawal_rejected,
+            user_id=result["user_id"],
+            amount_uzs=result["amount_uzs"],
+            reason=result["reason"],
+        )
+        
+        return {"status": "rejected", **result}
+    
+    raise ValueError("Invalid action")
+
+
 @router.post("/withdrawal/action")
 async def handle_withdrawal_action(
     request: WithdrawalActionRequest,
+    background_tasks: BackgroundTasks,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -119,166 +209,259 @@ async def handle_withdrawal_action(
     Handle withdrawal approval/rejection from admin channel.
     """
     try:
-        if request.admin_id != admin_user.id:
-            raise HTTPException(status_code=403, detail="Not authorized")
-        
-        if request.action == "approve":
-            result = await payment_service.confirm_withdrawal(
-                db, request.withdrawal_id, admin_user.id
-            )
-            
-            # Notify user
-            await telegram_service.send_withdrawal_confirmed(
-                user_id=result["user_id"],
-                amount_uzs=result["amount_uzs"],
-            )
-            
-            return {"status": "approved", **result}
-            
-        elif request.action == "reject":
-            result = await payment_service.reject_withdrawal(
-                db, request.withdrawal_id, admin_user.id, request.reason or "Заявка отклонена"
-            )
-            
-            # Notify user
-            await telegram_service.send_withdrawal_rejected(
-                user_id=result["user_id"],
-                amount_uzs=result["amount_uzs"],
-                reason=result["reason"],
-            )
-            
-            return {"status": "rejected", **result}
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid action")
-            
+        _ensure_same_admin(request.admin_id, admin_user)
+        result = await _apply_withdrawal_action(
+            db, background_tasks, admin_user.id,
+            request.withdrawal_id, request.action, request.reason,
+        )
+        await _invalidate_stats()
+        return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# ========== ADMIN STATISTICS ==========
+# ========== BATCHED ACTIONS ==========
 
-@router.get("/stats", response_model=AdminStatsResponse)
-async def get_admin_stats(
-    admin_id: int,
+_ACTION_APPLIERS = {
+    "payment": _apply_payment_action,
+    "withdrawal": _apply_withdrawal_action,
+}
+
+
+@router.post("/batch")
+async def handle_batch_actions(
+    request: BatchActionRequest,
+    background_tasks: BackgroundTasks,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get admin dashboard statistics"""
-    from sqlalchemy import select, func
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    """
+    Apply several payment/withdrawal actions in one request.
     
-    # Total users
-    result = await db.execute(select(func.count(User.id)))
-    total_users = result.scalar()
+    Each action commits on its own, exactly as the single endpoints do;
+    results come back in request order, with failures reported per item.
+    """
+    # Read once: a failed item's rollback expires admin_user, and refreshing
+    # it lazily is not possible under AsyncSession
+    admin_id = admin_user.id
+    results = []
+    for item in request.actions:
+        if item.admin_id is not None and item.admin_id != admin_id:
+            results.append({"ok": False, "error": "Not authorized"})
+            continue
+        try:
+            result = await _ACTION_APPLIERS[item.kind](
+                db, background_tasks, admin_id, item.id, item.action, item.reason,
+            )
+            results.append({"ok": True, **result})
+        except ValueError as e:
+            await db.rollback()
+            results.append({"ok": False, "error": str(e)})
+        except Exception as e:
+            # Earlier items are already committed and their notifications
+            # queued, so one failure must not abort the whole request
+            await db.rollback()
+            logger.error(
+                "Batch admin action failed",
+                kind=item.kind,
+                entity_id=item.id,
+                error=str(e),
+                exc_info=True,
+            )
+            results.append({"ok": False, "error": "Internal error"})
     
-    # Active users (with at least 1 generation)
-    result = await db.execute(
-        select(func.count(User.id)).where(User.total_generations > 0)
-    )
-    active_users = result.scalar()
+    await _invalidate_stats()
+    return ORJSONResponse({"results": results})
+
+
+# ========== ADMIN STATISTICS ==========
+
+async def _load_stats(db: AsyncSession) -> AdminStatsResponse:
+    """Dashboard aggregates: Redis -> database (-> stale copy)"""
+    cached = await cache_service.get_json(STATS_REDIS_KEY)
+    if cached is not None:
+        return AdminStatsResponse.model_construct(**cached)
     
-    # Pending payments
-    result = await db.execute(
-        select(func.count(Payment.id)).where(Payment.status == PaymentStatus.PENDING)
+    try:
+        stats = await _query_stats(db)
+    except SQLAlchemyError:
+        stale = await cache_service.get_json(STATS_STALE_KEY)
+        if stale is None:
+            raise
+        logger.warning("Stats query failed, serving stale stats", exc_info=True)
+        return AdminStatsResponse.model_construct(**stale)
+    
+    payload = stats.model_dump()
+    await cache_service.set_json(STATS_REDIS_KEY, payload, STATS_REDIS_TTL)
+    await cache_service.set_json(STATS_STALE_KEY, payload, STATS_STALE_TTL)
+    return stats
+
+
+async def _query_stats(db: AsyncSession) -> AdminStatsResponse:
+    # One aggregate pass per table using FILTER clauses, combined into a
+    # single one-row SELECT (one round-trip, each table scanned once)
+    users_q = select(
+        func.count(User.id).label("total_users"),
+        func.count(User.id).filter(User.total_generations > 0).label("active_users"),
+    ).subquery()
+    payments_q = select(
+        func.count(Payment.id)
+        .filter(Payment.status == PaymentStatus.PENDING)
+        .label("pending_payments"),
+        func.coalesce(
+            func.sum(Payment.amount_uzs).filter(Payment.status == PaymentStatus.APPROVED), 0
+        ).label("total_revenue"),
+    ).subquery()
+    withdrawals_q = select(
+        func.count(Withdrawal.id)
+        .filter(Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]))
+        .label("pending_withdrawals"),
+        func.coalesce(
+            func.sum(Withdrawal.amount_uzs).filter(Withdrawal.status == WithdrawalStatus.APPROVED), 0
+        ).label("total_payouts"),
+    ).subquery()
+    stmt = select(users_q, payments_q, withdrawals_q).select_from(
+        users_q.join(payments_q, true()).join(withdrawals_q, true())
     )
-    pending_payments = result.scalar()
+    row = (await db.execute(stmt)).one()
     
-    # Pending withdrawals
+    # Built from our own query; skip re-validation
+    return AdminStatsResponse.model_construct(
+        total_users=row.total_users,
+        active_users=row.active_users,
+        pending_payments=row.pending_payments,
+        pending_withdrawals=row.pending_withdrawals,
+        total_revenue_uzs=row.total_revenue,
+        total_payouts_uzs=row.total_payouts,
+    )
+
+
+async def _load_pending_payments(db: AsyncSession, limit: int, offset: int) -> list[dict]:
+    # Only the listed columns: no screenshot_data blobs, no ORM instances
     result = await db.execute(
-        select(func.count(Withdrawal.id)).where(
-            Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN])
+        select(
+            Payment.id,
+            Payment.user_id,
+            Payment.amount_uzs,
+            Payment.credits,
+            Payment.screenshot_url,
+            Payment.created_at,
         )
+        .where(Payment.status == PaymentStatus.PENDING)
+        .order_by(Payment.created_at.desc())
+        .limit(limit)
+        .offset(offset)
     )
-    pending_withdrawals = result.scalar()
     
-    # Total revenue
+    return [row._asdict() for row in result.all()]
+
+
+async def _load_pending_withdrawals(db: AsyncSession, limit: int, offset: int) -> list[dict]:
     result = await db.execute(
-        select(func.sum(Payment.amount_uzs)).where(Payment.status == PaymentStatus.APPROVED)
+        select(
+            Withdrawal.id,
+            Withdrawal.user_id,
+            Withdrawal.amount_uzs,
+            Withdrawal.card_number,
+            Withdrawal.card_type,
+            Withdrawal.status,
+            Withdrawal.created_at,
+        )
+        .where(Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]))
+        .order_by(Withdrawal.created_at.desc())
+        .limit(limit)
+        .offset(offset)
     )
-    total_revenue = result.scalar() or 0
     
-    # Total payouts
-    result = await db.execute(
-        select(func.sum(Withdrawal.amount_uzs)).where(Withdrawal.status == WithdrawalStatus.APPROVED)
-    )
-    total_payouts = result.scalar() or 0
+    return [
+        {
+            "id": w.id,
+            "user_id": w.user_id,
+            "amount_uzs": w.amount_uzs,
+            "card_number": w.card_number,
+            "card_type": w.card_type.value if w.card_type else None,
+            "status": w.status.value,
+            "created_at": w.created_at,
+        }
+        for w in result.all()
+    ]
+
+
+async def _in_own_session(loader, *args):
+    async with AsyncSessionLocal() as session:
+        return await loader(session, *args)
+
+
+@router.get(
+    "/stats",
+    response_model=None,
+    responses={200: {"model": AdminStatsResponse}},
+)
+async def get_admin_stats(
+    admin_id: Optional[int] = None,
+    admin_user=Depends(require_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get admin dashboard statistics"""
+    _ensure_same_admin(admin_id, admin_user)
     
-    return AdminStatsResponse(
-        total_users=total_users,
-        active_users=active_users,
-        pending_payments=pending_payments,
-        pending_withdrawals=pending_withdrawals,
-        total_revenue_uzs=total_revenue,
-        total_payouts_uzs=total_payouts,
-    )
+    return await _load_stats(db)
 
 
 @router.get("/payments/pending")
 async def get_pending_payments(
-    admin_id: int,
+    admin_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get list of pending payments"""
-    from sqlalchemy import select
-    from datetime import datetime
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    _ensure_same_admin(admin_id, admin_user)
     
-    result = await db.execute(
-        select(Payment)
-        .where(Payment.status == PaymentStatus.PENDING)
-        .order_by(Payment.created_at.desc())
-        .limit(50)
-    )
-    payments = result.scalars().all()
-    
-    return [
-        {
-            "id": p.id,
-            "user_id": p.user_id,
-            "amount_uzs": p.amount_uzs,
-            "credits": p.credits,
-            "screenshot_url": p.screenshot_url,
-            "created_at": p.created_at.isoformat() if p.created_at else None,
-        }
-        for p in payments
-    ]
+    # orjson serializes the datetimes natively, no jsonable_encoder pass
+    return ORJSONResponse(await _load_pending_payments(db, limit, offset))
 
 
 @router.get("/withdrawals/pending")
 async def get_pending_withdrawals(
-    admin_id: int,
+    admin_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get list of pending withdrawals"""
-    from sqlalchemy import select
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    _ensure_same_admin(admin_id, admin_user)
     
-    result = await db.execute(
-        select(Withdrawal)
-        .where(Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]))
-        .order_by(Withdrawal.created_at.desc())
-        .limit(50)
+    return ORJSONResponse(await _load_pending_withdrawals(db, limit, offset))
+
+
+@router.get("/dashboard")
+async def get_admin_dashboard(
+    admin_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    admin_user=Depends(require_admin_user),
+):
+    """
+    Stats and both pending queues in one response, so the admin page
+    needs a single request on load instead of three.
+    """
+    _ensure_same_admin(admin_id, admin_user)
+    
+    # An AsyncSession can't run statements concurrently, so give each
+    # loader its own short-lived session and overlap the round-trips
+    stats, payments, withdrawals = await asyncio.gather(
+        _in_own_session(_load_stats),
+        _in_own_session(_load_pending_payments, limit, 0),
+        _in_own_session(_load_pending_withdrawals, limit, 0),
     )
-    withdrawals = result.scalars().all()
     
-    return [
-        {
-            "id": w.id,
-            "user_id": w.user_id,
-            "amount_uzs": w.amount_uzs,
-            "card_number": w.card_number,
-            "card_type": w.card_type.value if w.card_type else None,
-            "status": w.status.value,
-            "created_at": w.created_at.isoformat() if w.created_at else None,
-        }
-        for w in withdrawals
-    ]
+    return ORJSONResponse({
+        "stats": stats.model_dump(),
+        "pending_payments": payments,
+        "pending_withdrawals": withdrawals,
+    })
 
 
 # ========== USER MANAGEMENT ==========
@@ -286,9 +469,9 @@ async def get_pending_withdrawals(
 @router.post("/user/{user_id}/credits")
 async def adjust_user_credits(
     user_id: int,
-    admin_id: int,
     amount: int,
     reason: str,
+    admin_id: Optional[int] = None,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -296,35 +479,39 @@ async def adjust_user_credits(
     Manually adjust user credits (add or remove).
     Amount can be positive (add) or negative (remove).
     """
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    user = await db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    old_balance = user.credits
-    user.credits += amount
+    _ensure_same_admin(admin_id, admin_user)
     
-    if user.credits < 0:
+    # Single atomic UPDATE; the balance guard is part of the WHERE clause
+    new_balance = await db.scalar(
+        update(User)
+        .where(User.id == user_id, User.credits + amount >= 0)
+        .values(credits=User.credits + amount)
+        .returning(User.credits)
+    )
+    if new_balance is None:
+        # Either no such user or the adjustment would go below zero
+        exists = await db.scalar(select(User.id).where(User.id == user_id))
+        if exists is None:
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=400, detail="Cannot set negative balance")
     
     await db.commit()
+    old_balance = new_balance - amount
     
     logger.info(
         "Admin credits adjustment",
         user_id=user_id,
-        admin_id=admin_id,
+        admin_id=admin_user.id,
         amount=amount,
         reason=reason,
         old_balance=old_balance,
-        new_balance=user.credits,
+        new_balance=new_balance,
     )
     
     return {
         "user_id": user_id,
         "old_balance": old_balance,
-        "new_balance": user.credits,
+        "new_balance": new_balance,
         "adjustment": amount,
         "reason": reason,
     }
@@ -333,23 +520,25 @@ async def adjust_user_credits(
 @router.post("/user/{user_id}/ban")
 async def ban_user(
     user_id: int,
-    admin_id: int,
     reason: str,
+    admin_id: Optional[int] = None,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Ban a user"""
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    _ensure_same_admin(admin_id, admin_user)
     
-    user = await db.get(User, user_id)
-    if not user:
+    banned_id = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_banned=True)
+        .returning(User.id)
+    )
+    if banned_id is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    user.is_banned = True
     await db.commit()
     
-    logger.info("User banned", user_id=user_id, admin_id=admin_id, reason=reason)
+    logger.info("User banned", user_id=user_id, admin_id=admin_user.id, reason=reason)
     
     return {"user_id": user_id, "is_banned": True}
 
@@ -357,21 +546,23 @@ async def ban_user(
 @router.post("/user/{user_id}/unban")
 async def unban_user(
     user_id: int,
-    admin_id: int,
+    admin_id: Optional[int] = None,
     admin_user=Depends(require_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Unban a user"""
-    if admin_id != admin_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    _ensure_same_admin(admin_id, admin_user)
     
-    user = await db.get(User, user_id)
-    if not user:
+    banned_id = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_banned=False)
+        .returning(User.id)
+    )
+    if banned_id is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    user.is_banned = False
     await db.commit()
     
-    logger.info("User unbanned", user_id=user_id, admin_id=admin_id)
+    logger.info("User unbanned", user_id=user_id, admin_id=admin_user.id)
     
     return {"user_id": user_id, "is_banned": False}
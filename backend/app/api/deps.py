@@ -45,6 +45,9 @@ async def require_current_user(
 ) -> User:
     """
     Load current user from DB using Telegram verified user id.
+
+    FastAPI caches dependencies per request, so an endpoint that also takes
+    Depends(get_db) gets this same session (and connection) back for free.
     """
     user = await db.get(User, tg_user["id"])
     if not user:
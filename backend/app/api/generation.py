@@ -1,29 +1,71 @@
 """
 Generation API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File, Form, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import select, desc, func, and_, tuple_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.schemas.generation import GenerationRequest, GenerationResponse
+from app.database import get_db, BackgroundSessionLocal
+from app.models import Generation, GenerationStatus, User, Transaction, TransactionType
+from app.schemas.generation import (
+    GenerationRequest,
+    GenerationResponse,
+    GenerationHistoryItem,
+    GenerationHistoryPage,
+)
 from app.services.generation import generation_service
 from app.services.storage import StorageUploadError, storage_service
 from app.services.user import user_service
 from app.services.telegram import telegram_service
+from app.services.cache import cache_service
+from app.exceptions import AppError
 from app.api.deps import require_current_user
 from app.schemas.user import TelegramUser
-from app.config import settings
+from pydantic import ValidationError
 import structlog
 from datetime import datetime
+from typing import Optional
 import json
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/generation", tags=["Generation"])
 
+IDEMPOTENCY_CACHE_TTL = 600  # seconds; matches the generation timeout
 
-@router.post("/start", response_model=dict)
+
+def _inline_schema(model) -> dict:
+    """Model JSON schema with $defs inlined, for use in openapi_extra"""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+
+    return resolve(schema)
+
+
+@router.post(
+    "/start",
+    response_model=None,
+    responses={200: {"model": GenerationResponse}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_schema(GenerationRequest)}},
+        },
+    },
+)
 async def start_generation(
-    request: GenerationRequest,
+    raw_request: Request,
     background_tasks: BackgroundTasks,
     current_user=Depends(require_current_user),
     db: AsyncSession = Depends(get_db),
@@ -38,46 +80,35 @@ async def start_generation(
     4. Process generation in background with fallback
     5. Send result via Telegram when done
     """
+    # Parse and validate the raw body in one pydantic-core pass instead of
+    # json.loads() into a dict and validating that
+    try:
+        request = GenerationRequest.model_validate_json(await raw_request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    
     try:
-        # Ensure request user matches authenticated user
+        # init_data was verified by require_current_user (X-Telegram-Init-Data);
+        # the body only has to name the same user
         if request.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized")
 
-        # Verify Telegram init_data signature
-        from app.services.telegram import telegram_service
+        # Extract idempotency key from request (if provided)
+        idempotency_key = request.idempotency_key
         
-        if request.init_data:
-            is_valid = telegram_service.verify_init_data(
-                init_data=request.init_data,
-                user_id=request.user_id
-            )
-            if not is_valid:
-                logger.warning(
-                    "Invalid init_data signature",
-                    user_id=request.user_id,
-                )
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "code": "INVALID_SIGNATURE",
-                        "message": "Недействительная подпись Telegram WebApp",
-                    }
+        # A retried submit gets the original answer from Redis, but only while
+        # that generation is still active; a finished one may be retried
+        cache_key = None
+        if idempotency_key:
+            cache_key = f"idem:{current_user.id}:{idempotency_key}"
+            cached = await cache_service.get_json(cache_key)
+            if cached is not None:
+                status = await db.scalar(
+                    select(Generation.status).where(Generation.id == cached["id"])
                 )
-        else:
-            logger.warning("No init_data provided", user_id=request.user_id)
-            # In production, reject requests without init_data
-            # For development, allow but log warning
-            if not settings.debug:
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "code": "MISSING_INIT_DATA",
-                        "message": "Требуется init_data от Telegram WebApp",
-                    }
-                )
-        
-        # Extract idempotency key from request (if provided)
-        idempotency_key = getattr(request, 'idempotency_key', None)
+                if status in (GenerationStatus.PENDING, GenerationStatus.PROCESSING):
+                    return cached
+                await cache_service.delete(cache_key)
         
         # Start generation (atomic, with all validations)
         result = await generation_service.start_generation(
@@ -86,6 +117,9 @@ async def start_generation(
             idempotency_key=idempotency_key,
         )
         
+        if cache_key:
+            await cache_service.set_json(cache_key, result, IDEMPOTENCY_CACHE_TTL, nx=True)
+        
         # Process generation in background with fallback protection
         background_tasks.add_task(
             process_generation_background,
@@ -102,17 +136,10 @@ async def start_generation(
                 "message": str(e),
             }
         )
+    except AppError:
+        # Rendered by the app-wide AppError handler
+        raise
     except Exception as e:
-        # Handle custom exceptions with proper HTTP codes
-        if hasattr(e, 'http_status') and hasattr(e, 'code'):
-            raise HTTPException(
-                status_code=e.http_status,
-                detail={
-                    "code": e.code,
-                    "message": e.user_message if hasattr(e, 'user_message') else str(e),
-                }
-            )
-        
         # Generic errors
         logger.error("Generation start failed", error=str(e), error_type=type(e).__name__)
         raise HTTPException(
@@ -124,7 +151,11 @@ async def start_generation(
         )
 
 
-@router.post("/start-file", response_model=dict)
+@router.post(
+    "/start-file",
+    response_model=None,
+    responses={200: {"model": GenerationResponse}},
+)
 async def start_generation_with_file(
     payload: str = Form(...),
     image: UploadFile = File(...),
@@ -189,10 +220,7 @@ async def process_generation_background(generation_id: int):
     
     IMPROVED: Fallback protection for data loss prevention.
     """
-    from app.database import AsyncSessionLocal
-    from app.models import Generation, GenerationStatus, User, Transaction, TransactionType
-    
-    async with AsyncSessionLocal() as db:
+    async with BackgroundSessionLocal() as db:
         try:
             await generation_service.process_generation(db, generation_id)
             
@@ -205,61 +233,16 @@ async def process_generation_background(generation_id: int):
             )
             
             # ========== FALLBACK: Emergency refund ==========
-            # Prevents data loss if background task crashes
+            # Prevents data loss if background task crashes.
+            # Reuse this session (no second pool checkout) unless it is unusable
+            # (invalid state or a dropped connection).
             try:
-                async with AsyncSessionLocal() as fallback_db:
-                    gen = await fallback_db.get(Generation, generation_id)
-                    
-                    if gen and gen.status in [GenerationStatus.PENDING, GenerationStatus.PROCESSING]:
-                        # Mark as failed
-                        gen.status = GenerationStatus.FAILED
-                        gen.error_message = "Internal server error (background task crashed)"
-                        gen.completed_at = datetime.utcnow()
-                        
-                        # Refund credits only if charged
-                        from sqlalchemy import select, func, and_
-                        charged = await fallback_db.scalar(
-                            select(func.count(Transaction.id)).where(
-                                and_(
-                                    Transaction.type == TransactionType.GENERATION,
-                                    Transaction.reference_id == generation_id,
-                                )
-                            )
-                        )
-
-                        if charged:
-                            user = await fallback_db.get(User, gen.user_id)
-                            if user:
-                                user.credits += gen.credits_charged
-
-                                refund = Transaction(
-                                    user_id=user.id,
-                                    type=TransactionType.REFUND,
-                                    amount=gen.credits_charged,
-                                    reference_id=generation_id,
-                                    description=f"Emergency refund for crashed generation #{generation_id}",
-                                )
-                                fallback_db.add(refund)
-                        
-                        await fallback_db.commit()
-                        
-                        logger.info(
-                            "Emergency refund completed",
-                            generation_id=generation_id,
-                            credits_refunded=gen.credits_charged,
-                        )
-                        
-                        # Try to notify user
-                        try:
-                            from app.services.telegram import telegram_service
-                            await telegram_service.send_generation_error(
-                                user_id=gen.user_id,
-                                model_name=gen.model_name,
-                                error_message="Внутренняя ошибка сервера. Кредиты возвращены.",
-                                credits_refunded=gen.credits_charged,
-                            )
-                        except:
-                            pass  # Notification failure is not critical
+                try:
+                    await db.rollback()
+                    await _emergency_refund(db, generation_id)
+                except SQLAlchemyError:
+                    async with BackgroundSessionLocal() as fallback_db:
+                        await _emergency_refund(fallback_db, generation_id)
                             
             except Exception as fallback_error:
                 logger.critical(
@@ -270,15 +253,73 @@ async def process_generation_background(generation_id: int):
                 # TODO: Send alert to admin Telegram channel
 
 
+async def _emergency_refund(db: AsyncSession, generation_id: int):
+    """Mark a crashed generation as failed and refund it if it was charged"""
+    gen = await db.get(Generation, generation_id)
+    
+    if gen and gen.status in [GenerationStatus.PENDING, GenerationStatus.PROCESSING]:
+        # Mark as failed
+        gen.status = GenerationStatus.FAILED
+        gen.error_message = "Internal server error (background task crashed)"
+        gen.completed_at = datetime.utcnow()
+        
+        # Refund credits only if charged
+        charged = await db.scalar(
+            select(func.count(Transaction.id)).where(
+                and_(
+                    Transaction.type == TransactionType.GENERATION,
+                    Transaction.reference_id == generation_id,
+                )
+            )
+        )
+
+        if charged:
+            user = await db.get(User, gen.user_id)
+            if user:
+                user.credits += gen.credits_charged
+
+                refund = Transaction(
+                    user_id=user.id,
+                    type=TransactionType.REFUND,
+                    amount=gen.credits_charged,
+                    reference_id=generation_id,
+                    description=f"Emergency refund for crashed generation #{generation_id}",
+                )
+                db.add(refund)
+        
+        await db.commit()
+        
+        logger.info(
+            "Emergency refund completed",
+            generation_id=generation_id,
+            credits_refunded=gen.credits_charged,
+        )
+        
+        # Try to notify user
+        try:
+            await telegram_service.send_generation_error(
+                user_id=gen.user_id,
+                model_name=gen.model_name,
+                error_message="Внутренняя ошибка сервера. Кредиты возвращены.",
+                credits_refunded=gen.credits_charged,
+            )
+        except:
+            pass  # Notification failure is not critical
+
+
 @router.get("/status/{generation_id}")
 async def get_generation_status(
     generation_id: int,
+    if_none_match: Optional[str] = Header(default=None),
     current_user=Depends(require_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get generation status"""
-    from app.models import Generation
+    """
+    Get generation status.
     
+    Clients poll this until the generation finishes; the response carries
+    an ETag so unchanged polls get a bodyless 304.
+    """
     generation = await db.get(Generation, generation_id)
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
@@ -286,14 +327,25 @@ async def get_generation_status(
     if generation.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    return {
-        "id": generation.id,
-        "status": generation.status.value,
-        "result_url": generation.result_url,
-        "error_message": generation.error_message,
-        "created_at": generation.created_at.isoformat(),
-        "completed_at": generation.completed_at.isoformat() if generation.completed_at else None,
-    }
+    # Only status/completion change while a client polls
+    completed_ts = int(generation.completed_at.timestamp()) if generation.completed_at else 0
+    etag = f'"{generation.id}-{generation.status.value}-{completed_ts}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    # orjson encodes the datetimes natively
+    return ORJSONResponse(
+        {
+            "id": generation.id,
+            "status": generation.status.value,
+            "result_url": generation.result_url,
+            "error_message": generation.error_message,
+            "created_at": generation.created_at,
+            "completed_at": generation.completed_at,
+        },
+        headers=headers,
+    )
 
 
 @router.post("/cancel/{generation_id}")
@@ -317,53 +369,92 @@ async def cancel_generation(
         raise HTTPException(status_code=403, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        if hasattr(e, 'http_status'):
-            raise HTTPException(
-                status_code=e.http_status,
-                detail={"code": getattr(e, 'code', 'ERROR'), "message": str(e)}
-            )
+    except AppError:
+        raise
+    except Exception:
         raise HTTPException(status_code=500, detail="Internal error")
 
 
-@router.get("/history/{user_id}")
+@router.get(
+    "/history/{user_id}",
+    response_model=None,
+    responses={200: {"model": GenerationHistoryPage}},
+)
 async def get_generation_history(
     user_id: int,
     limit: int = 20,
     offset: int = 0,
+    before_id: Optional[int] = None,
     current_user=Depends(require_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get user's generation history"""
-    from sqlalchemy import select, desc
-    from app.models import Generation
-
+    """
+    Get user's generation history, newest first.
+    
+    Pass the last item's id as before_id to get the next page (keyset
+    pagination); offset is kept for older clients.
+    """
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    total_stmt = select(func.count(Generation.id)).where(Generation.user_id == user_id)
+    
+    # Project just the listed columns; the DB trims the prompt to 101 chars,
+    # enough to tell whether it needs the "..." suffix. The user's total
+    # comes along as an uncorrelated subquery (evaluated once, same trip).
     stmt = (
-        select(Generation)
+        select(
+            total_stmt.scalar_subquery().label("total"),
+            Generation.id,
+            Generation.model_name,
+            func.substr(Generation.prompt, 1, 101).label("prompt"),
+            Generation.status,
+            Generation.credits_charged,
+            Generation.created_at,
+            Generation.result_url,
+        )
         .where(Generation.user_id == user_id)
-        .order_by(desc(Generation.created_at))
+        .order_by(desc(Generation.created_at), desc(Generation.id))
         .limit(limit)
-        .offset(offset)
     )
+    if before_id is not None:
+        cursor_created_at = (
+            select(Generation.created_at)
+            .where(Generation.id == before_id, Generation.user_id == user_id)
+            .scalar_subquery()
+        )
+        stmt = stmt.where(
+            tuple_(Generation.created_at, Generation.id) < tuple_(cursor_created_at, before_id)
+        )
+    elif offset:
+        stmt = stmt.offset(offset)
     
     result = await db.execute(stmt)
-    generations = result.scalars().all()
+    generations = result.all()
     
-    return {
-        "items": [
-            {
-                "id": g.id,
-                "model_name": g.model_name,
-                "prompt": g.prompt[:100] + "..." if len(g.prompt) > 100 else g.prompt,
-                "status": g.status.value,
-                "credits_charged": g.credits_charged,
-                "created_at": g.created_at.isoformat(),
-                "result_url": g.result_url,
-            }
+    if generations:
+        total = generations[0].total
+    elif offset or before_id is not None:
+        # Paged past the end: no row to carry the total
+        total = await db.scalar(total_stmt)
+    else:
+        total = 0
+    
+    # Rows come from our own query: build the models without validation and
+    # let pydantic-core write the JSON directly (no dict/jsonable_encoder pass)
+    page = GenerationHistoryPage.model_construct(
+        items=[
+            GenerationHistoryItem.model_construct(
+                id=g.id,
+                model_name=g.model_name,
+                prompt=g.prompt[:100] + "..." if len(g.prompt) > 100 else g.prompt,
+                status=g.status.value,
+                credits_charged=g.credits_charged,
+                created_at=g.created_at,
+                result_url=g.result_url,
+            )
             for g in generations
         ],
-        "total": len(generations),
-    }
+        total=total,
+    )
+    return Response(content=page.model_dump_json(), media_type="application/json")
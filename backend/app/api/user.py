@@ -1,12 +1,16 @@
 """
 User API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
+import hashlib
+import orjson
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.schemas.user import UserCreate, UserResponse, UserBalance, TelegramUser
 from app.api.deps import require_telegram_user, require_current_user
 from app.services.user import user_service
@@ -61,8 +65,22 @@ async def authenticate_user(
     Authenticate or register user from Telegram WebApp.
     Handles referral linking on first registration.
     """
+    # The body must describe the same user the signature vouches for;
+    # reject before touching the database
+    if data.telegram_user.id != tg_user["id"]:
+        logger.warning(
+            "Telegram user mismatch in auth payload",
+            body_user_id=data.telegram_user.id,
+            tg_user_id=tg_user["id"],
+        )
+        raise HTTPException(
+            status_code=401,
+            detail={"code": "USER_MISMATCH", "message": "Данные пользователя не совпадают"},
+        )
+
     try:
-        tg_payload = TelegramUser(
+        # Fields come from signature-verified init_data; skip re-validation
+        tg_payload = TelegramUser.model_construct(
             id=tg_user["id"],
             username=tg_user.get("username"),
             first_name=tg_user.get("first_name"),
@@ -70,21 +88,11 @@ async def authenticate_user(
             language_code=tg_user.get("language_code") or "ru",
         )
 
-        if data.telegram_user.id != tg_payload.id:
-            logger.warning(
-                "Telegram user mismatch in auth payload",
-                body_user_id=data.telegram_user.id,
-                tg_user_id=tg_payload.id,
-            )
-
-        user = await user_service.get_or_create_user(db, tg_payload, data.referral_code)
-        
-        # Process referral if provided and not already linked
-        if data.referral_code and not user.referrer_id:
-            await referral_service.process_referral(db, user.id, data.referral_code)
+        # Upsert + referral link in one transaction
+        user = await user_service.auth_upsert(db, tg_payload, data.referral_code)
         
         # Return format expected by frontend
-        return {
+        return ORJSONResponse({
             "user": {
                 "id": user.id,
                 "username": user.username,
@@ -93,7 +101,7 @@ async def authenticate_user(
                 "language_code": user.language_code,
             },
             "credits": user.credits,
-        }
+        })
         
     except Exception as e:
         logger.error("User auth failed", error=str(e))
@@ -104,41 +112,98 @@ async def authenticate_user(
 async def get_user_balance(
     user_id: int,
     current_user=Depends(require_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """Get user balance"""
-    from app.models import User
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    user = await db.get(User, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return {
-        "credits": user.credits,
-        "referral_balance": user.referral_balance,
-        "referral_total_earned": user.referral_total_earned,
-    }
+    # require_current_user already loaded (and 404'd on) this exact row
+    return ORJSONResponse({
+        "credits": current_user.credits,
+        "referral_balance": current_user.referral_balance,
+        "referral_total_earned": current_user.referral_total_earned,
+    })
 
 
 # ========== TOP-UP ==========
 
+# Packages and card details only change with settings, i.e. on redeploy:
+# encode once and let clients revalidate against a content hash
+_PACKAGES_PAYLOAD = orjson.dumps({
+    "packages": payment_service.get_credit_packages(),
+    "card": {
+        "number": settings.payment_card_number,
+        "holder": settings.payment_card_holder,
+        "type": settings.payment_card_type,
+    },
+})
+_PACKAGES_HEADERS = {
+    "ETag": f'"{hashlib.blake2b(_PACKAGES_PAYLOAD, digest_size=8).hexdigest()}"',
+    "Cache-Control": "public, max-age=300",
+}
+
+
 @router.get("/packages")
-async def get_credit_packages():
+async def get_credit_packages(
+    if_none_match: Optional[str] = Header(default=None),
+):
     """Get available credit packages"""
-    return {
-        "packages": payment_service.get_credit_packages(),
-        "card": {
-            "number": settings.payment_card_number,
-            "holder": settings.payment_card_holder,
-            "type": settings.payment_card_type,
-        },
-    }
+    if if_none_match == _PACKAGES_HEADERS["ETag"]:
+        return Response(status_code=304, headers=_PACKAGES_HEADERS)
+    return Response(
+        _PACKAGES_PAYLOAD,
+        media_type="application/json",
+        headers=_PACKAGES_HEADERS,
+    )
+
+
+async def _finalize_topup(payment_info: dict, request: TopUpRequest):
+    """Post the payment to the admin channel, store its message id, notify the user"""
+    try:
+        # The two sends are independent; overlap them
+        message_id, notified = await asyncio.gather(
+            telegram_service.send_payment_to_channel(
+                payment_id=payment_info["payment_id"],
+                user_id=request.user_id,
+                username=payment_info["username"],
+                first_name=payment_info["first_name"],
+                credits=request.credits,
+                amount_uzs=request.amount_uzs,
+                screenshot_data=request.screenshot_base64,
+            ),
+            telegram_service.send_payment_pending(
+                user_id=request.user_id,
+                credits=request.credits,
+                amount_uzs=request.amount_uzs,
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(message_id, Exception):
+            raise message_id
+        if isinstance(notified, Exception):
+            # The user may have blocked the bot; the admin post still counts
+            logger.warning(
+                "User payment notification failed",
+                user_id=request.user_id,
+                error=str(notified),
+            )
+        
+        # The request session is gone by now; open a short-lived one
+        async with AsyncSessionLocal() as db:
+            await payment_service.set_payment_message_id(
+                db, payment_info["payment_id"], message_id
+            )
+    except Exception as e:
+        logger.error(
+            "Top-up finalize failed",
+            payment_id=payment_info["payment_id"],
+            error=str(e),
+        )
 
 
 @router.post("/topup")
 async def request_topup(
     request: TopUpRequest,
+    background_tasks: BackgroundTasks,
     current_user=Depends(require_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -160,42 +225,20 @@ async def request_topup(
         )
         
         if payment_info.get("is_duplicate"):
-            return {
+            return ORJSONResponse({
                 "payment_id": payment_info["payment_id"],
                 "status": payment_info["status"],
                 "message": "Заявка уже существует",
-            }
+            })
         
-        # Send to admin channel
-        message_id = await telegram_service.send_payment_to_channel(
-            payment_id=payment_info["payment_id"],
-            user_id=request.user_id,
-            username=payment_info["username"],
-            first_name=payment_info["first_name"],
-            credits=request.credits,
-            amount_uzs=request.amount_uzs,
-            screenshot_data=request.screenshot_base64,
-        )
-        
-        # Update payment with message_id
-        from app.models import Payment
-        payment = await db.get(Payment, payment_info["payment_id"])
-        if payment:
-            payment.telegram_message_id = message_id
-            await db.commit()
+        # Admin channel post and user notification happen after the response
+        background_tasks.add_task(_finalize_topup, payment_info, request)
         
-        # Notify user
-        await telegram_service.send_payment_pending(
-            user_id=request.user_id,
-            credits=request.credits,
-            amount_uzs=request.amount_uzs,
-        )
-        
-        return {
+        return ORJSONResponse({
             "payment_id": payment_info["payment_id"],
             "status": "pending",
             "message": "Заявка создана. Ожидайте подтверждения.",
-        }
+        })
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -203,9 +246,51 @@ async def request_topup(
 
 # ========== WITHDRAWAL ==========
 
+async def _finalize_withdrawal(withdrawal_info: dict, request: WithdrawRequest):
+    """Post the withdrawal to the admin channel, store its message id, notify the user"""
+    try:
+        message_id, notified = await asyncio.gather(
+            telegram_service.send_withdrawal_to_channel(
+                withdrawal_id=withdrawal_info["withdrawal_id"],
+                user_id=request.user_id,
+                username=withdrawal_info["username"],
+                first_name=withdrawal_info["first_name"],
+                amount_uzs=request.amount_uzs,
+                card_number=withdrawal_info["card_number"],
+                card_type=withdrawal_info["card_type"],
+            ),
+            telegram_service.send_withdrawal_pending(
+                user_id=request.user_id,
+                amount_uzs=request.amount_uzs,
+                card_number=withdrawal_info["card_number"],
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(message_id, Exception):
+            raise message_id
+        if isinstance(notified, Exception):
+            logger.warning(
+                "User withdrawal notification failed",
+                user_id=request.user_id,
+                error=str(notified),
+            )
+        
+        async with AsyncSessionLocal() as db:
+            await payment_service.set_withdrawal_message_id(
+                db, withdrawal_info["withdrawal_id"], message_id
+            )
+    except Exception as e:
+        logger.error(
+            "Withdrawal finalize failed",
+            withdrawal_id=withdrawal_info["withdrawal_id"],
+            error=str(e),
+        )
+
+
 @router.post("/withdraw")
 async def request_withdrawal(
     request: WithdrawRequest,
+    background_tasks: BackgroundTasks,
     current_user=Depends(require_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -225,36 +310,14 @@ async def request_withdrawal(
             request.card_number,
         )
         
-        # Send to admin channel
-        message_id = await telegram_service.send_withdrawal_to_channel(
-            withdrawal_id=withdrawal_info["withdrawal_id"],
-            user_id=request.user_id,
-            username=withdrawal_info["username"],
-            first_name=withdrawal_info["first_name"],
-            amount_uzs=request.amount_uzs,
-            card_number=withdrawal_info["card_number"],
-            card_type=withdrawal_info["card_type"],
-        )
-        
-        # Update withdrawal with message_id
-        from app.models import Withdrawal
-        withdrawal = await db.get(Withdrawal, withdrawal_info["withdrawal_id"])
-        if withdrawal:
-            withdrawal.telegram_message_id = message_id
-            await db.commit()
-        
-        # Notify user
-        await telegram_service.send_withdrawal_pending(
-            user_id=request.user_id,
-            amount_uzs=request.amount_uzs,
-            card_number=withdrawal_info["card_number"],
-        )
+        # Admin channel post and user notification happen after the response
+        background_tasks.add_task(_finalize_withdrawal, withdrawal_info, request)
         
-        return {
+        return ORJSONResponse({
             "withdrawal_id": withdrawal_info["withdrawal_id"],
             "status": "frozen",
             "message": "Заявка на вывод создана.",
-        }
+        })
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -262,7 +325,11 @@ async def request_withdrawal(
 
 # ========== REFERRAL / PARTNER ==========
 
-@router.get("/partner/{user_id}", response_model=PartnerStatsResponse)
+@router.get(
+    "/partner/{user_id}",
+    response_model=None,
+    responses={200: {"model": PartnerStatsResponse}},
+)
 async def get_partner_stats(
     user_id: int,
     current_user=Depends(require_current_user),
@@ -273,7 +340,8 @@ async def get_partner_stats(
         if user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized")
         stats = await referral_service.get_partner_stats(db, user_id)
-        return PartnerStatsResponse(**stats)
+        # Built by our own service from plain columns; encode it as is
+        return ORJSONResponse(stats)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -289,6 +357,6 @@ async def get_partner_referrals(
         if user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized")
         referrals = await referral_service.get_referral_list(db, user_id)
-        return {"referrals": referrals}
+        return ORJSONResponse({"referrals": referrals})
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
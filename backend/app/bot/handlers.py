@@ -1,7 +1,7 @@
 """
 Telegram Bot Handlers
 """
-from telegram import Update, WebAppInfo
+from telegram import Update
 from telegram.ext import (
     ContextTypes,
     CommandHandler,
@@ -9,18 +9,102 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-import json
+import asyncio
+import functools
+import re
+from typing import Optional
 import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
 
 from app.config import settings
-from app.bot.keyboards import main_menu_keyboard, video_models_keyboard, image_models_keyboard, back_keyboard
-from app.bot.messages import WELCOME_MESSAGE, VIDEO_MODELS_MESSAGE, IMAGE_MODELS_MESSAGE
+from app.bot.keyboards import main_menu_keyboard, video_models_keyboard, image_models_keyboard
+from app.bot.messages import WELCOME_MESSAGE, HELP_MESSAGE, VIDEO_MODELS_MESSAGE, IMAGE_MODELS_MESSAGE
 import structlog
 
 logger = structlog.get_logger()
 
 API_BASE = settings.webapp_url.replace("https://app.", "https://api.") if "app." in settings.webapp_url else "http://localhost:8000"
 
+# One pooled client for all bot -> API calls; keeps connections alive
+# between updates instead of paying a TCP/TLS handshake per call.
+# The transport retries failed connection attempts only - nothing has been
+# sent at that point, so this is safe for the non-idempotent POSTs too
+_client = httpx.AsyncClient(
+    base_url=API_BASE,
+    timeout=httpx.Timeout(15.0, connect=2.0),
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128),
+    ),
+)
+
+
+# Request bodies are encoded with orjson rather than httpx's stdlib json
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+async def _post_json(path: str, body: dict, timeout: float) -> httpx.Response:
+    """POST a JSON body through the shared client"""
+    return await _client.post(
+        path,
+        content=orjson.dumps(body),
+        headers=_JSON_HEADERS,
+        timeout=timeout,
+    )
+
+
+async def close_http_client():
+    """Close the shared API client (call on bot shutdown)"""
+    # The admin batch worker posts through the client; stop it first
+    if _admin_worker is not None:
+        _admin_worker.cancel()
+    await _client.aclose()
+
+
+# Deep link payload: ref_<code>; codes come from secrets.token_urlsafe(8)
+# (11 url-safe base64 chars), accept a little slack on the length
+REF_PREFIX = "ref_"
+REF_CODE_RE = re.compile(r"[A-Za-z0-9_-]{4,16}")
+
+# Static menu screens: callback_data -> (text, keyboard), rendered once at import
+MENU_RENDER = {
+    "menu_video": (VIDEO_MODELS_MESSAGE, video_models_keyboard()),
+    "menu_image": (IMAGE_MODELS_MESSAGE, image_models_keyboard()),
+}
+
+# Users already registered through /auth; repeat /start skips the API call.
+# Registration is permanent, so entries need no expiry - only a size bound
+REGISTERED_CACHE_SIZE = 100_000
+_registered_users: LRUCache = LRUCache(maxsize=REGISTERED_CACHE_SIZE)
+
+# Balances shown by /balance; dropped when the bot sees a balance change
+BALANCE_CACHE_SIZE = 10_000
+BALANCE_CACHE_TTL = 15  # seconds
+_balance_cache: TTLCache = TTLCache(maxsize=BALANCE_CACHE_SIZE, ttl=BALANCE_CACHE_TTL)
+
+
+def guarded(error_event: str, user_message: Optional[str] = None):
+    """
+    Log any exception the handler raises instead of letting it escape.
+    
+    Handlers take either the Update or the Telegram user id first; with an
+    Update and a user_message, the user also gets that reply.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(first, *args, **kwargs):
+            try:
+                return await fn(first, *args, **kwargs)
+            except Exception as e:
+                is_update = isinstance(first, Update)
+                user_id = first.effective_user.id if is_update else first
+                logger.error(error_event, error=str(e), user_id=user_id)
+                if is_update and user_message:
+                    await first.effective_message.reply_text(user_message)
+        return wrapper
+    return decorator
+
 
 # ========== USER COMMANDS ==========
 
@@ -33,16 +117,19 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Check for referral code
     referral_code = None
-    if args and args[0].startswith("ref_"):
-        referral_code = args[0][4:]  # Remove "ref_" prefix
-        logger.info("Referral detected", user_id=user.id, referral_code=referral_code)
+    if args and args[0].startswith(REF_PREFIX):
+        code = args[0][len(REF_PREFIX):]
+        # Malformed codes can never match; don't send them to the API
+        if REF_CODE_RE.fullmatch(code):
+            referral_code = code
+            logger.info("Referral detected", user_id=user.id, referral_code=referral_code)
     
-    # Register user via API
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE}/api/user/auth",
-                json={
+    # Register user via API (a referral link always goes through so it can be applied)
+    if referral_code or user.id not in _registered_users:
+        try:
+            response = await _post_json(
+                "/api/user/auth",
+                body={
                     "telegram_user": {
                         "id": user.id,
                         "username": user.username,
@@ -55,8 +142,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 timeout=10.0,
             )
             response.raise_for_status()
-    except Exception as e:
-        logger.error("Failed to register user", error=str(e), user_id=user.id)
+            _registered_users[user.id] = True
+        except Exception as e:
+            logger.error("Failed to register user", error=str(e), user_id=user.id)
     
     await update.message.reply_text(
         WELCOME_MESSAGE.format(name=user.first_name or "друг"),
@@ -67,46 +155,35 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command"""
-    help_text = (
-        "🤖 <b>NanoGen Bot</b>\n\n"
-        "Генерация AI видео и изображений.\n\n"
-        "<b>Команды:</b>\n"
-        "/start — Главное меню\n"
-        "/help — Справка\n"
-        "/balance — Баланс\n\n"
-        "<b>Поддержка:</b> @nanogen_support"
-    )
-    await update.message.reply_text(help_text, parse_mode="HTML")
+    await update.message.reply_text(HELP_MESSAGE, parse_mode="HTML")
 
 
+@guarded("Failed to get balance", "❌ Ошибка получения баланса. Попробуйте позже.")
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /balance command"""
     user = update.effective_user
     
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{API_BASE}/api/user/balance/{user.id}",
-                timeout=10.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            text = (
-                f"💎 <b>Ваш баланс:</b> {data['credits']} кредитов\n\n"
-                f"💰 <b>Партнёрский баланс:</b> {data['referral_balance']:,} UZS\n"
-                f"📊 <b>Всего заработано:</b> {data['referral_total_earned']:,} UZS"
-            )
-            
-            await update.message.reply_text(
-                text,
-                parse_mode="HTML",
-                reply_markup=main_menu_keyboard(),
-            )
-            
-    except Exception as e:
-        logger.error("Failed to get balance", error=str(e), user_id=user.id)
-        await update.message.reply_text("❌ Ошибка получения баланса. Попробуйте позже.")
+    data = _balance_cache.get(user.id)
+    if data is None:
+        response = await _client.get(
+            f"/api/user/balance/{user.id}",
+            timeout=10.0,
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        _balance_cache[user.id] = data
+    
+    text = (
+        f"💎 <b>Ваш баланс:</b> {data['credits']} кредитов\n\n"
+        f"💰 <b>Партнёрский баланс:</b> {data['referral_balance']:,} UZS\n"
+        f"📊 <b>Всего заработано:</b> {data['referral_total_earned']:,} UZS"
+    )
+    
+    await update.message.reply_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=main_menu_keyboard(),
+    )
 
 
 # ========== CALLBACK HANDLERS ==========
@@ -119,85 +196,186 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     data = query.data
     user = update.effective_user
     
-    logger.info("Callback", user_id=user.id, data=data)
+    # Fires on every button press: keep it below the production level
+    logger.debug("Callback", user_id=user.id, data=data)
     
-    # Main menu navigation
-    if data == "back_main":
-        await query.edit_message_text(
-            WELCOME_MESSAGE.format(name=user.first_name or "друг"),
-            parse_mode="HTML",
-            reply_markup=main_menu_keyboard(),
+    # Admin actions carry "<action>:<id>"; menu callbacks are bare names
+    head, _, arg = data.partition(":")
+    if arg:
+        route = _PREFIX_CALLBACKS.get(head)
+        # Ignore forged/garbled ids instead of failing in int()
+        if route and arg.isdigit():
+            handler, action = route
+            await handler(query, user.id, int(arg), action)
+    else:
+        handler = _EXACT_CALLBACKS.get(data)
+        if handler:
+            await handler(query, user, data)
+
+
+async def _show_main_menu(query, user, data: str):
+    """Main menu navigation"""
+    await query.edit_message_text(
+        WELCOME_MESSAGE.format(name=user.first_name or "друг"),
+        parse_mode="HTML",
+        reply_markup=main_menu_keyboard(),
+    )
+
+
+async def _show_static_menu(query, user, data: str):
+    """Video / image model menus"""
+    text, keyboard = MENU_RENDER[data]
+    await query.edit_message_text(
+        text,
+        parse_mode="HTML",
+        reply_markup=keyboard,
+    )
+
+
+# ========== ADMIN ACTION BATCHING ==========
+
+# Admin clicks arriving within a short window reach the API as one
+# /api/admin/batch call instead of one round-trip each
+ADMIN_BATCH_WINDOW = 0.02  # seconds
+ADMIN_BATCH_MAX = 20
+_admin_queue: asyncio.Queue = None
+_admin_worker: asyncio.Task = None
+
+
+class AdminActionError(Exception):
+    """The API refused one action of a batch"""
+
+
+async def _submit_admin_action(admin_id: int, kind: str, entity_id: int, action: str) -> dict:
+    """Queue an admin action and wait for its own result from the batch"""
+    global _admin_queue, _admin_worker
+    if _admin_worker is None or _admin_worker.done():
+        _admin_queue = asyncio.Queue()
+        _admin_worker = asyncio.create_task(_admin_batch_worker(_admin_queue))
+    
+    future = asyncio.get_running_loop().create_future()
+    item = {"kind": kind, "id": entity_id, "admin_id": admin_id, "action": action}
+    await _admin_queue.put((admin_id, item, future))
+    
+    result = await future
+    if not result["ok"]:
+        raise AdminActionError(result["error"])
+    return result
+
+
+async def _admin_batch_worker(queue: asyncio.Queue):
+    """Collect queued admin actions for a short window and post them together"""
+    while True:
+        batch = [await queue.get()]
+        await asyncio.sleep(ADMIN_BATCH_WINDOW)
+        while len(batch) < ADMIN_BATCH_MAX and not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        # The API acts as one authenticated admin per call
+        groups = {}
+        for admin_id, item, future in batch:
+            groups.setdefault(admin_id, []).append((item, future))
+        await asyncio.gather(*(_post_admin_batch(group) for group in groups.values()))
+
+
+async def _post_admin_batch(group: list):
+    """Post one admin's actions and resolve each waiting future"""
+    try:
+        response = await _post_json(
+            "/api/admin/batch",
+            body={"actions": [item for item, _ in group]},
+            timeout=15.0,
         )
+        response.raise_for_status()
+        results = orjson.loads(response.content)["results"]
+    except Exception as e:
+        for _, future in group:
+            if not future.done():
+                future.set_exception(e)
+        return
     
-    elif data == "menu_video":
-        await query.edit_message_text(
-            VIDEO_MODELS_MESSAGE,
+    for (_, future), result in zip(group, results):
+        if not future.done():
+            future.set_result(result)
+    # A short results list must not leave a callback waiting forever
+    for _, future in group[len(results):]:
+        if not future.done():
+            future.set_result({"ok": False, "error": "No result from API"})
+
+
+# ========== ADMIN CALLBACK HELPERS ==========
+
+async def _edit_admin_message(query, text: str, reply_markup=None):
+    """Replace the admin channel post's text (or photo caption)"""
+    if query.message.photo:
+        await query.edit_message_caption(
+            caption=text,
             parse_mode="HTML",
-            reply_markup=video_models_keyboard(),
+            reply_markup=reply_markup,
         )
-    
-    elif data == "menu_image":
+    else:
         await query.edit_message_text(
-            IMAGE_MODELS_MESSAGE,
+            text=text,
             parse_mode="HTML",
-            reply_markup=image_models_keyboard(),
+            reply_markup=reply_markup,
         )
+
+
+async def _run_admin_action(query, admin_id: int, kind: str, entity_id: int, action: str, status_text: str):
+    """
+    Submit the action and mark the post as processed at the same time.
     
-    # Admin callbacks (from admin channel)
-    elif data.startswith("payment_approve:"):
-        payment_id = int(data.split(":")[1])
-        await handle_payment_admin_callback(query, user.id, payment_id, "approve")
+    The new text depends only on the action, so the edit does not wait for
+    the API; if the API refuses, the original text and buttons are put back.
+    """
+    # The *_html forms keep the post's formatting and escape user-supplied
+    # text, so they can be re-sent with parse_mode="HTML"
+    message = query.message
+    if message.text:
+        original_text = message.text_html
+    else:
+        original_text = message.caption_html if message.caption else ""
+    original_markup = message.reply_markup
+    new_text = original_text + f"\n\n━━━━━━━━━━━━━━━\n<b>{status_text}</b> админом {admin_id}"
     
-    elif data.startswith("payment_reject:"):
-        payment_id = int(data.split(":")[1])
-        await handle_payment_admin_callback(query, user.id, payment_id, "reject")
+    result, edited = await asyncio.gather(
+        _submit_admin_action(admin_id, kind, entity_id, action),
+        _edit_admin_message(query, new_text),
+        return_exceptions=True,
+    )
     
-    elif data.startswith("withdraw_approve:"):
-        withdrawal_id = int(data.split(":")[1])
-        await handle_withdrawal_admin_callback(query, user.id, withdrawal_id, "approve")
+    if isinstance(result, Exception):
+        if not isinstance(edited, Exception):
+            try:
+                await _edit_admin_message(query, original_text, original_markup)
+            except Exception as e:
+                # Keep the API error for the admin; the restore is best effort
+                logger.error(
+                    "Admin message restore failed",
+                    kind=kind,
+                    entity_id=entity_id,
+                    error=str(e),
+                )
+        raise result
+    if isinstance(edited, Exception):
+        logger.warning(
+            "Admin message edit failed",
+            kind=kind,
+            entity_id=entity_id,
+            error=str(edited),
+        )
     
-    elif data.startswith("withdraw_reject:"):
-        withdrawal_id = int(data.split(":")[1])
-        await handle_withdrawal_admin_callback(query, user.id, withdrawal_id, "reject")
+    _balance_cache.pop(result["user_id"], None)
 
 
-# ========== ADMIN CALLBACK HELPERS ==========
-
 async def handle_payment_admin_callback(query, admin_id: int, payment_id: int, action: str):
     """Handle payment approval/rejection from admin"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE}/api/admin/payment/action",
-                json={
-                    "payment_id": payment_id,
-                    "admin_id": admin_id,
-                    "action": action,
-                },
-                timeout=15.0,
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Update message
-            status_text = "✅ ПОДТВЕРЖДЕНО" if action == "approve" else "❌ ОТКЛОНЕНО"
-            original_text = query.message.text or query.message.caption or ""
-            
-            new_text = original_text + f"\n\n━━━━━━━━━━━━━━━\n<b>{status_text}</b> админом {admin_id}"
-            
-            if query.message.photo:
-                await query.edit_message_caption(
-                    caption=new_text,
-                    parse_mode="HTML",
-                    reply_markup=None,
-                )
-            else:
-                await query.edit_message_text(
-                    text=new_text,
-                    parse_mode="HTML",
-                    reply_markup=None,
-                )
-            
+        status_text = "✅ ПОДТВЕРЖДЕНО" if action == "approve" else "❌ ОТКЛОНЕНО"
+        await _run_admin_action(query, admin_id, "payment", payment_id, action, status_text)
+        
+    except AdminActionError as e:
+        await query.answer(f"Ошибка: {e}", show_alert=True)
     except httpx.HTTPStatusError as e:
         error_detail = e.response.json().get("detail", "Unknown error")
         await query.answer(f"Ошибка: {error_detail}", show_alert=True)
@@ -209,30 +387,11 @@ async def handle_payment_admin_callback(query, admin_id: int, payment_id: int, a
 async def handle_withdrawal_admin_callback(query, admin_id: int, withdrawal_id: int, action: str):
     """Handle withdrawal approval/rejection from admin"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE}/api/admin/withdrawal/action",
-                json={
-                    "withdrawal_id": withdrawal_id,
-                    "admin_id": admin_id,
-                    "action": action,
-                },
-                timeout=15.0,
-            )
-            response.raise_for_status()
-            
-            # Update message
-            status_text = "✅ ВЫПЛАЧЕНО" if action == "approve" else "❌ ОТКЛОНЕНО"
-            original_text = query.message.text or ""
-            
-            new_text = original_text + f"\n\n━━━━━━━━━━━━━━━\n<b>{status_text}</b> админом {admin_id}"
-            
-            await query.edit_message_text(
-                text=new_text,
-                parse_mode="HTML",
-                reply_markup=None,
-            )
-            
+        status_text = "✅ ВЫПЛАЧЕНО" if action == "approve" else "❌ ОТКЛОНЕНО"
+        await _run_admin_action(query, admin_id, "withdrawal", withdrawal_id, action, status_text)
+        
+    except AdminActionError as e:
+        await query.answer(f"Ошибка: {e}", show_alert=True)
     except httpx.HTTPStatusError as e:
         error_detail = e.response.json().get("detail", "Unknown error")
         await query.answer(f"Ошибка: {error_detail}", show_alert=True)
@@ -241,6 +400,21 @@ async def handle_withdrawal_admin_callback(query, admin_id: int, withdrawal_id:
         await query.answer("Ошибка обработки. Попробуйте позже.", show_alert=True)
 
 
+# Callback dispatch tables (used by callback_handler)
+_EXACT_CALLBACKS = {
+    "back_main": _show_main_menu,
+    **{key: _show_static_menu for key in MENU_RENDER},
+}
+
+# Admin callbacks (from admin channel)
+_PREFIX_CALLBACKS = {
+    "payment_approve": (handle_payment_admin_callback, "approve"),
+    "payment_reject": (handle_payment_admin_callback, "reject"),
+    "withdraw_approve": (handle_withdrawal_admin_callback, "approve"),
+    "withdraw_reject": (handle_withdrawal_admin_callback, "reject"),
+}
+
+
 # ========== WEBAPP DATA HANDLER ==========
 
 async def webapp_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -249,19 +423,19 @@ async def webapp_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     data_str = update.effective_message.web_app_data.data
     
     try:
-        data = json.loads(data_str)
+        data = orjson.loads(data_str)
         logger.info("WebApp data received", user_id=user.id, type=data.get("type"))
         
-        if data["type"] == "video_gen":
-            await handle_video_generation(user.id, data["payload"], context)
-        elif data["type"] == "image_gen":
-            await handle_image_generation(user.id, data["payload"], context)
-        elif data["type"] == "payment_confirm":
-            await handle_payment_confirm(user.id, data["payload"], context)
-        elif data["type"] == "withdraw_request":
-            await handle_withdraw_request(user.id, data["payload"], context)
+        handler = _WEBAPP_HANDLERS.get(data["type"])
+        if handler:
+            # Let the update finish now; the API round-trip runs as a
+            # tracked application task (awaited on shutdown)
+            context.application.create_task(
+                handler(user.id, data["payload"], context),
+                update=update,
+            )
         
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error("Invalid JSON from WebApp", data=data_str)
     except Exception as e:
         logger.error("WebApp data handler error", error=str(e), user_id=user.id)
@@ -269,61 +443,56 @@ async def webapp_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # DEPRECATED: These handlers are no longer used as frontend calls /api/generation/start directly
 # Keeping for backward compatibility only
-async def handle_video_generation(user_id: int, payload: dict, context: ContextTypes.DEFAULT_TYPE):
-    """DEPRECATED: Handle video generation request from WebApp (legacy)"""
-    logger.warning("Deprecated handle_video_generation called", user_id=user_id)
-    await context.bot.send_message(
-        chat_id=user_id,
-        text="⚠️ Пожалуйста, используйте новую версию приложения для генерации.",
-    )
-
-
-async def handle_image_generation(user_id: int, payload: dict, context: ContextTypes.DEFAULT_TYPE):
-    """DEPRECATED: Handle image generation request from WebApp (legacy)"""
-    logger.warning("Deprecated handle_image_generation called", user_id=user_id)
+@guarded("Legacy generation notice failed")
+async def handle_legacy_generation(user_id: int, payload: dict, context: ContextTypes.DEFAULT_TYPE):
+    """DEPRECATED: Handle video/image generation request from WebApp (legacy)"""
+    logger.warning("Deprecated WebApp generation called", user_id=user_id)
     await context.bot.send_message(
         chat_id=user_id,
         text="⚠️ Пожалуйста, используйте новую версию приложения для генерации.",
     )
 
 
+@guarded("Payment confirm failed")
 async def handle_payment_confirm(user_id: int, payload: dict, context: ContextTypes.DEFAULT_TYPE):
     """Handle payment confirmation from WebApp"""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE}/api/user/topup",
-                json={
-                    "user_id": user_id,
-                    "credits": payload.get("credits", 100),
-                    "amount_uzs": payload.get("amount_uzs", 50000),
-                    "screenshot_base64": payload.get("screenshot"),
-                },
-                timeout=15.0,
-            )
-            response.raise_for_status()
-            
-    except Exception as e:
-        logger.error("Payment confirm failed", error=str(e), user_id=user_id)
+    response = await _post_json(
+        "/api/user/topup",
+        body={
+            "user_id": user_id,
+            "credits": payload.get("credits", 100),
+            "amount_uzs": payload.get("amount_uzs", 50000),
+            "screenshot_base64": payload.get("screenshot"),
+        },
+        timeout=15.0,
+    )
+    response.raise_for_status()
 
 
+@guarded("Withdraw request failed")
 async def handle_withdraw_request(user_id: int, payload: dict, context: ContextTypes.DEFAULT_TYPE):
     """Handle withdrawal request from WebApp"""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE}/api/user/withdraw",
-                json={
-                    "user_id": user_id,
-                    "amount_uzs": payload.get("amount"),
-                    "card_number": payload.get("card"),
-                },
-                timeout=15.0,
-            )
-            response.raise_for_status()
-            
-    except Exception as e:
-        logger.error("Withdraw request failed", error=str(e), user_id=user_id)
+    response = await _post_json(
+        "/api/user/withdraw",
+        body={
+            "user_id": user_id,
+            "amount_uzs": payload.get("amount"),
+            "card_number": payload.get("card"),
+        },
+        timeout=15.0,
+    )
+    response.raise_for_status()
+    # The requested amount is frozen off the partner balance right away
+    _balance_cache.pop(user_id, None)
+
+
+# WebApp data "type" -> handler (used by webapp_data_handler)
+_WEBAPP_HANDLERS = {
+    "video_gen": handle_legacy_generation,
+    "image_gen": handle_legacy_generation,
+    "payment_confirm": handle_payment_confirm,
+    "withdraw_request": handle_withdraw_request,
+}
 
 
 # ========== SETUP ==========
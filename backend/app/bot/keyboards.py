@@ -6,7 +6,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from app.config import settings
 
 
-def main_menu_keyboard() -> InlineKeyboardMarkup:
+def _build_main_menu_keyboard() -> InlineKeyboardMarkup:
     """Main menu - 2x2 grid"""
     webapp_url = settings.webapp_url
     
@@ -22,40 +22,58 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+# (button label, WebApp model slug)
+VIDEO_MODELS = [
+    ("⚡ Kling 2.6 Pro — 15💎", "kling-2-6-pro"),
+    ("🎥 Kling I2V — 15💎", "kling-i2v"),
+    ("🧠 Kling O1 — 10💎", "kling-o1"),
+    ("💨 Kling Turbo — 7💎", "kling-turbo"),
+    ("🌐 Veo 3.1 — 20💎", "veo-3-1"),
+    ("✨ Sora 2 Pro — 20💎", "sora-2-pro"),
+    ("🎬 Runway Gen4 — 15💎", "runway-gen4"),
+    ("🌱 Seedance — 8💎", "seedance"),
+    ("🌊 Wan 2.5 — 5💎", "wan-2-5"),
+    ("🌊 Wan 2.6 — 7💎", "wan-2-6"),
+]
+
+IMAGE_MODELS = [
+    ("🤖 GPT Image — 5💎", "gpt-image"),
+    ("🌈 Imagen 4 — 4💎", "imagen-4"),
+    ("🍌 Nano Banana — 1💎", "nano-banana"),
+    ("🔧 Upscale — 2💎", "upscale"),
+]
+
+
+def _build_models_keyboard(models: list) -> InlineKeyboardMarkup:
+    """One Web App button per model plus Back, decoded from Bot API JSON"""
+    webapp_url = settings.webapp_url
+    rows = [
+        [{"text": label, "web_app": {"url": f"{webapp_url}/model/{slug}"}}]
+        for label, slug in models
+    ]
+    rows.append([{"text": "◀️ Назад", "callback_data": "back_main"}])
+    return InlineKeyboardMarkup.de_json({"inline_keyboard": rows}, None)
+
+
+# ========== PREBUILT MARKUPS ==========
+# settings.webapp_url is fixed for the life of the process and markups are
+# immutable, so every handler can share one instance of each
+
+MAIN_MENU_KEYBOARD = _build_main_menu_keyboard()
+VIDEO_MODELS_KEYBOARD = _build_models_keyboard(VIDEO_MODELS)
+IMAGE_MODELS_KEYBOARD = _build_models_keyboard(IMAGE_MODELS)
+
+
+def main_menu_keyboard() -> InlineKeyboardMarkup:
+    """Main menu - 2x2 grid"""
+    return MAIN_MENU_KEYBOARD
+
+
 def video_models_keyboard() -> InlineKeyboardMarkup:
     """Video models - each button opens Web App directly"""
-    webapp_url = settings.webapp_url
-    
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("⚡ Kling 2.6 Pro — 15💎", web_app=WebAppInfo(url=f"{webapp_url}/model/kling-2-6-pro"))],
-        [InlineKeyboardButton("🎥 Kling I2V — 15💎", web_app=WebAppInfo(url=f"{webapp_url}/model/kling-i2v"))],
-        [InlineKeyboardButton("🧠 Kling O1 — 10💎", web_app=WebAppInfo(url=f"{webapp_url}/model/kling-o1"))],
-        [InlineKeyboardButton("💨 Kling Turbo — 7💎", web_app=WebAppInfo(url=f"{webapp_url}/model/kling-turbo"))],
-        [InlineKeyboardButton("🌐 Veo 3.1 — 20💎", web_app=WebAppInfo(url=f"{webapp_url}/model/veo-3-1"))],
-        [InlineKeyboardButton("✨ Sora 2 Pro — 20💎", web_app=WebAppInfo(url=f"{webapp_url}/model/sora-2-pro"))],
-        [InlineKeyboardButton("🎬 Runway Gen4 — 15💎", web_app=WebAppInfo(url=f"{webapp_url}/model/runway-gen4"))],
-        [InlineKeyboardButton("🌱 Seedance — 8💎", web_app=WebAppInfo(url=f"{webapp_url}/model/seedance"))],
-        [InlineKeyboardButton("🌊 Wan 2.5 — 5💎", web_app=WebAppInfo(url=f"{webapp_url}/model/wan-2-5"))],
-        [InlineKeyboardButton("🌊 Wan 2.6 — 7💎", web_app=WebAppInfo(url=f"{webapp_url}/model/wan-2-6"))],
-        [InlineKeyboardButton("◀️ Назад", callback_data="back_main")],
-    ])
+    return VIDEO_MODELS_KEYBOARD
 
 
 def image_models_keyboard() -> InlineKeyboardMarkup:
     """Image models - each button opens Web App directly"""
-    webapp_url = settings.webapp_url
-    
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🤖 GPT Image — 5💎", web_app=WebAppInfo(url=f"{webapp_url}/model/gpt-image"))],
-        [InlineKeyboardButton("🌈 Imagen 4 — 4💎", web_app=WebAppInfo(url=f"{webapp_url}/model/imagen-4"))],
-        [InlineKeyboardButton("🍌 Nano Banana — 1💎", web_app=WebAppInfo(url=f"{webapp_url}/model/nano-banana"))],
-        [InlineKeyboardButton("🔧 Upscale — 2💎", web_app=WebAppInfo(url=f"{webapp_url}/model/upscale"))],
-        [InlineKeyboardButton("◀️ Назад", callback_data="back_main")],
-    ])
-
-
-def back_keyboard() -> InlineKeyboardMarkup:
-    """Simple back button"""
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("◀️ Назад", callback_data="back_main")],
-    ])
+    return IMAGE_MODELS_KEYBOARD
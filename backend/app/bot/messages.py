@@ -28,11 +28,20 @@ IMAGE_MODELS_MESSAGE = """🖼 <b>Генерация изображений</b>
 Нажмите на модель — откроется генератор."""
 
 
-# ========== FUNCTIONS (dynamic messages) ==========
+HELP_MESSAGE = (
+    "🤖 <b>NanoGen Bot</b>\n\n"
+    "Генерация AI видео и изображений.\n\n"
+    "<b>Команды:</b>\n"
+    "/start — Главное меню\n"
+    "/help — Справка\n"
+    "/balance — Баланс\n\n"
+    "<b>Поддержка:</b> @nanogen_support"
+)
 
-def welcome_message(name: str, credits: int) -> str:
-    """Welcome message on /start"""
-    return f"""👋 Привет, <b>{name}</b>!
+
+# ========== TEMPLATES (filled per call with %) ==========
+
+WELCOME_BALANCE_TEMPLATE = """👋 Привет, <b>%s</b>!
 
 Я — <b>NanoGen</b>, твой AI-генератор контента.
 
@@ -40,31 +49,35 @@ def welcome_message(name: str, credits: int) -> str:
 🖼 Генерирую изображения любого стиля
 ✨ Быстро, качественно, доступно
 
-💎 Твой баланс: <b>{credits}</b> кредитов
+💎 Твой баланс: <b>%d</b> кредитов
 
 Выбери действие:"""
 
 
-def main_menu_message(credits: int) -> str:
-    """Main menu message"""
-    return f"""🏠 <b>Главное меню</b>
+MAIN_MENU_TEMPLATE = """🏠 <b>Главное меню</b>
 
-💎 Баланс: <b>{credits}</b> кредитов
+💎 Баланс: <b>%d</b> кредитов
 
 Выберите действие:"""
 
 
+# ========== FUNCTIONS (dynamic messages) ==========
+
+def welcome_message(name: str, credits: int) -> str:
+    """Welcome message on /start"""
+    return WELCOME_BALANCE_TEMPLATE % (name, credits)
+
+
+def main_menu_message(credits: int) -> str:
+    """Main menu message"""
+    return MAIN_MENU_TEMPLATE % credits
+
+
 def video_menu_message() -> str:
     """Video models menu"""
-    return """🎬 <b>Генерация видео</b>
-
-Выберите модель для создания видео.
-Нажмите на модель — откроется генератор."""
+    return VIDEO_MODELS_MESSAGE
 
 
 def image_menu_message() -> str:
     """Image models menu"""
-    return """🖼 <b>Генерация изображений</b>
-
-Выберите модель для создания изображения.
-Нажмите на модель — откроется генератор."""
+    return IMAGE_MODELS_MESSAGE
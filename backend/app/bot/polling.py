@@ -16,7 +16,7 @@ import asyncio
 from telegram.ext import Application
 
 from app.config import settings
-from app.bot.handlers import setup_handlers
+from app.bot.handlers import setup_handlers, close_http_client
 import structlog
 
 logger = structlog.get_logger()
@@ -25,6 +25,15 @@ logger = structlog.get_logger()
 async def main():
     """Run bot in polling mode (development only)"""
     
+    # With a webhook URL configured the API app (main.py) owns the bot and
+    # receives pushed updates; polling here would race it for getUpdates
+    if settings.telegram_webhook_url:
+        logger.error(
+            "TELEGRAM_WEBHOOK_URL is set - updates are delivered to the API webhook, not polled",
+            webhook_url=settings.telegram_webhook_url,
+        )
+        return
+    
     logger.info("Starting Telegram Bot in POLLING mode (development)")
     logger.warning("Do NOT use polling in production - use webhooks!")
     
@@ -57,8 +66,14 @@ async def main():
         await app.updater.stop()
         await app.stop()
         await app.shutdown()
+        await close_http_client()
         logger.info("Bot stopped")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,19 +1,31 @@
 """
 Application Configuration
 """
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 from typing import Optional
 from pydantic import Field
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    
     # ========== APP ==========
     app_name: str = "NanoGen API"
     debug: bool = False
     
     # ========== DATABASE ==========
     database_url: str = Field(..., validation_alias="DATABASE_URL")
+    db_pool_size: int = 20  # persistent connections in the request pool
+    db_max_overflow: int = 40  # extra connections allowed under bursts
+    db_pool_recycle: int = 1800  # seconds; drop connections before the proxy/server does
+    db_background_pool_size: int = 5  # separate pool for background generation work
+    db_background_max_overflow: int = 5  # burst headroom for the background pool
+    # Worst case per process: pool + overflow of both engines (20+40+5+5 = 70
+    # with these defaults). Postgres defaults to max_connections=100, so two
+    # workers can exhaust it; size these per deployment (workers x total).
+    db_statement_cache_size: int = 1024  # prepared statements kept per connection
+    db_query_cache_size: int = 1200  # compiled SQL kept per engine (SQLAlchemy default 500)
     
     # ========== REDIS ==========
     redis_url: str = "redis://localhost:6379/0"
@@ -21,6 +33,8 @@ class Settings(BaseSettings):
     # ========== TELEGRAM BOT ==========
     telegram_bot_token: str
     telegram_webhook_url: Optional[str] = None
+    telegram_update_queue_size: int = 1000  # webhook updates buffered before shedding
+    telegram_update_workers: int = 8  # tasks draining the webhook queue
     
     # Admin channel for payments/withdrawals review
     telegram_admin_channel_id: int = Field(-1001234567890, validation_alias="TELEGRAM_ADMIN_CHANNEL_ID")
@@ -87,14 +101,11 @@ class Settings(BaseSettings):
     price_imagen_ultra: int = 18900
     price_nano_banana: int = 12285
     price_nano_banana_pro: int = 47250
-    
-    class Config:
-        env_file = ".env"
-        extra = "ignore"
 
 
 @lru_cache()
 def get_settings() -> Settings:
+    """Read and validate .env once per process; import `settings` instead."""
     return Settings()
 
 
@@ -2,12 +2,36 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.orm import declarative_base
 from app.config import settings
 
+# Keep more prepared statements per connection (asyncpg's own cache and
+# SQLAlchemy's adapter cache both default to 100), so repeated lookups
+# skip the parse/plan step
+_connect_args = {
+    "statement_cache_size": settings.db_statement_cache_size,
+    "prepared_statement_cache_size": settings.db_statement_cache_size,
+}
+
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    query_cache_size=settings.db_query_cache_size,
+    connect_args=_connect_args,
+)
+
+# Background generation work gets its own small pool, so long-running
+# tasks can't starve request handlers of connections (and vice versa)
+background_engine = create_async_engine(
+    settings.database_url,
+    echo=settings.debug,
+    pool_pre_ping=True,
+    pool_size=settings.db_background_pool_size,
+    max_overflow=settings.db_background_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    query_cache_size=settings.db_query_cache_size,
+    connect_args=_connect_args,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -18,15 +42,21 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+BackgroundSessionLocal = async_sessionmaker(
+    background_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 Base = declarative_base()
 
 
 async def get_db() -> AsyncSession:
+    # Exiting the context closes the session and returns its connection
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
 
 
 async def init_db():
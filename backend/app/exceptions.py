@@ -4,6 +4,47 @@ Structured error handling with codes and user messages
 """
 from typing import Optional
 
+import orjson
+
+
+# ========== CODES & MESSAGES ==========
+
+_CODE_USER_NOT_FOUND = "USER_NOT_FOUND"
+_MSG_USER_NOT_FOUND = "Пользователь не найден"
+
+_CODE_USER_BANNED = "USER_BANNED"
+_MSG_USER_BANNED = "Ваш аккаунт заблокирован. Обратитесь в поддержку."
+
+_CODE_INSUFFICIENT_CREDITS = "INSUFFICIENT_CREDITS"
+_TMPL_INSUFFICIENT_CREDITS = "Недостаточно кредитов. Нужно {required} 💎, доступно {available} 💎"
+
+_CODE_CONCURRENT_UPDATE = "CONCURRENT_UPDATE"
+_MSG_CONCURRENT_UPDATE = "Попробуйте ещё раз через секунду"
+
+_CODE_RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
+_TMPL_RATE_LIMIT_EXCEEDED = "Слишком много запросов. Подождите {retry_after} сек."
+
+_CODE_MAX_ACTIVE_GENERATIONS = "MAX_ACTIVE_GENERATIONS"
+_TMPL_MAX_ACTIVE_GENERATIONS = "Максимум {max_allowed} активных генераций. Дождитесь завершения."
+
+_CODE_GENERATION_NOT_FOUND = "GENERATION_NOT_FOUND"
+_MSG_GENERATION_NOT_FOUND = "Генерация не найдена"
+
+_CODE_MODEL_UNAVAILABLE = "MODEL_UNAVAILABLE"
+_MSG_MODEL_UNAVAILABLE = "Модель временно недоступна. Попробуйте другую."
+
+_CODE_GENERATION_TIMEOUT = "GENERATION_TIMEOUT"
+_TMPL_GENERATION_TIMEOUT = "Генерация превысила лимит времени ({timeout_seconds}s). Кредиты возвращены."
+
+_CODE_DUPLICATE_REQUEST = "DUPLICATE_REQUEST"
+_MSG_DUPLICATE_REQUEST = "Этот запрос уже обрабатывается"
+
+_CODE_INSUFFICIENT_BALANCE = "INSUFFICIENT_BALANCE"
+_TMPL_INSUFFICIENT_BALANCE = "Недостаточно средств для вывода. Доступно: {available:,} UZS"
+
+_CODE_MINIMUM_WITHDRAWAL = "MINIMUM_WITHDRAWAL"
+_TMPL_MINIMUM_WITHDRAWAL = "Минимальная сумма вывода: {minimum:,} UZS"
+
 
 class AppError(Exception):
     """Base application error"""
@@ -19,6 +60,8 @@ class AppError(Exception):
         self.user_message = user_message
         self.internal_details = internal_details
         self.http_status = http_status
+        # Encoded once so the exception handler only has to send it
+        self._payload_bytes = orjson.dumps(self.to_dict())
         super().__init__(f"{code}: {user_message}")
     
     def to_dict(self):
@@ -26,6 +69,10 @@ class AppError(Exception):
             "code": self.code,
             "message": self.user_message,
         }
+    
+    def to_bytes(self) -> bytes:
+        """JSON response body: {"code": ..., "message": ...}"""
+        return self._payload_bytes
 
 
 # ========== USER ERRORS ==========
@@ -33,8 +80,8 @@ class AppError(Exception):
 class UserNotFoundError(AppError):
     def __init__(self, user_id: int):
         super().__init__(
-            code="USER_NOT_FOUND",
-            user_message="Пользователь не найден",
+            code=_CODE_USER_NOT_FOUND,
+            user_message=_MSG_USER_NOT_FOUND,
             internal_details=f"user_id={user_id}",
             http_status=404,
         )
@@ -43,8 +90,8 @@ class UserNotFoundError(AppError):
 class UserBannedError(AppError):
     def __init__(self):
         super().__init__(
-            code="USER_BANNED",
-            user_message="Ваш аккаунт заблокирован. Обратитесь в поддержку.",
+            code=_CODE_USER_BANNED,
+            user_message=_MSG_USER_BANNED,
             http_status=403,
         )
 
@@ -54,8 +101,8 @@ class UserBannedError(AppError):
 class InsufficientCreditsError(AppError):
     def __init__(self, required: int, available: int):
         super().__init__(
-            code="INSUFFICIENT_CREDITS",
-            user_message=f"Недостаточно кредитов. Нужно {required} 💎, доступно {available} 💎",
+            code=_CODE_INSUFFICIENT_CREDITS,
+            user_message=_TMPL_INSUFFICIENT_CREDITS.format(required=required, available=available),
             internal_details=f"required={required}, available={available}",
             http_status=402,  # Payment Required
         )
@@ -64,8 +111,8 @@ class InsufficientCreditsError(AppError):
 class ConcurrentUpdateError(AppError):
     def __init__(self):
         super().__init__(
-            code="CONCURRENT_UPDATE",
-            user_message="Попробуйте ещё раз через секунду",
+            code=_CODE_CONCURRENT_UPDATE,
+            user_message=_MSG_CONCURRENT_UPDATE,
             internal_details="Race condition detected",
             http_status=409,  # Conflict
         )
@@ -76,8 +123,8 @@ class ConcurrentUpdateError(AppError):
 class RateLimitError(AppError):
     def __init__(self, retry_after: int = 60):
         super().__init__(
-            code="RATE_LIMIT_EXCEEDED",
-            user_message=f"Слишком много запросов. Подождите {retry_after} сек.",
+            code=_CODE_RATE_LIMIT_EXCEEDED,
+            user_message=_TMPL_RATE_LIMIT_EXCEEDED.format(retry_after=retry_after),
             internal_details=f"retry_after={retry_after}",
             http_status=429,  # Too Many Requests
         )
@@ -86,8 +133,8 @@ class RateLimitError(AppError):
 class MaxActiveGenerationsError(AppError):
     def __init__(self, max_allowed: int):
         super().__init__(
-            code="MAX_ACTIVE_GENERATIONS",
-            user_message=f"Максимум {max_allowed} активных генераций. Дождитесь завершения.",
+            code=_CODE_MAX_ACTIVE_GENERATIONS,
+            user_message=_TMPL_MAX_ACTIVE_GENERATIONS.format(max_allowed=max_allowed),
             internal_details=f"max={max_allowed}",
             http_status=409,  # Conflict
         )
@@ -98,8 +145,8 @@ class MaxActiveGenerationsError(AppError):
 class GenerationNotFoundError(AppError):
     def __init__(self, generation_id: int):
         super().__init__(
-            code="GENERATION_NOT_FOUND",
-            user_message="Генерация не найдена",
+            code=_CODE_GENERATION_NOT_FOUND,
+            user_message=_MSG_GENERATION_NOT_FOUND,
             internal_details=f"generation_id={generation_id}",
             http_status=404,
         )
@@ -108,8 +155,8 @@ class GenerationNotFoundError(AppError):
 class ModelUnavailableError(AppError):
     def __init__(self, model_id: str):
         super().__init__(
-            code="MODEL_UNAVAILABLE",
-            user_message="Модель временно недоступна. Попробуйте другую.",
+            code=_CODE_MODEL_UNAVAILABLE,
+            user_message=_MSG_MODEL_UNAVAILABLE,
             internal_details=f"model={model_id}",
             http_status=503,  # Service Unavailable
         )
@@ -118,8 +165,8 @@ class ModelUnavailableError(AppError):
 class GenerationTimeoutError(AppError):
     def __init__(self, timeout_seconds: int):
         super().__init__(
-            code="GENERATION_TIMEOUT",
-            user_message=f"Генерация превысила лимит времени ({timeout_seconds}s). Кредиты возвращены.",
+            code=_CODE_GENERATION_TIMEOUT,
+            user_message=_TMPL_GENERATION_TIMEOUT.format(timeout_seconds=timeout_seconds),
             internal_details=f"timeout={timeout_seconds}",
             http_status=504,  # Gateway Timeout
         )
@@ -128,8 +175,8 @@ class GenerationTimeoutError(AppError):
 class DuplicateRequestError(AppError):
     def __init__(self):
         super().__init__(
-            code="DUPLICATE_REQUEST",
-            user_message="Этот запрос уже обрабатывается",
+            code=_CODE_DUPLICATE_REQUEST,
+            user_message=_MSG_DUPLICATE_REQUEST,
             http_status=409,  # Conflict
         )
 
@@ -139,8 +186,8 @@ class DuplicateRequestError(AppError):
 class InsufficientBalanceError(AppError):
     def __init__(self, required: int, available: int):
         super().__init__(
-            code="INSUFFICIENT_BALANCE",
-            user_message=f"Недостаточно средств для вывода. Доступно: {available:,} UZS",
+            code=_CODE_INSUFFICIENT_BALANCE,
+            user_message=_TMPL_INSUFFICIENT_BALANCE.format(available=available),
             internal_details=f"required={required}, available={available}",
             http_status=402,
         )
@@ -149,8 +196,8 @@ class InsufficientBalanceError(AppError):
 class MinimumWithdrawalError(AppError):
     def __init__(self, minimum: int):
         super().__init__(
-            code="MINIMUM_WITHDRAWAL",
-            user_message=f"Минимальная сумма вывода: {minimum:,} UZS",
+            code=_CODE_MINIMUM_WITHDRAWAL,
+            user_message=_TMPL_MINIMUM_WITHDRAWAL.format(minimum=minimum),
             internal_details=f"min={minimum}",
             http_status=400,
         )
@@ -2,37 +2,47 @@
 NanoGen Backend - Main Application
 ONLY API - Telegram bot runs separately or via webhook only
 """
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, BackgroundTasks
+from typing import Awaitable, Callable
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from telegram import Update
 from telegram.ext import Application
 
 from app.config import settings
 from app.database import init_db
+from app.exceptions import AppError
 from app.api import generation, user, admin
-from app.bot.handlers import setup_handlers
+from app.bot.handlers import setup_handlers, close_http_client
+from app.services.cache import cache_service
+import logging
+import orjson
 import structlog
 
+
 # Configure logging
+# The filtering bound logger turns calls below the level into no-ops before
+# any event dict is built or a processor runs; BytesLogger writes the orjson
+# output straight to stdout without decoding it
 structlog.configure(
     processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
+        structlog.processors.add_log_level,
         structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(serializer=orjson.dumps),
     ],
-    wrapper_class=structlog.stdlib.BoundLogger,
+    wrapper_class=structlog.make_filtering_bound_logger(
+        logging.DEBUG if settings.debug else logging.INFO
+    ),
     context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
+    logger_factory=structlog.BytesLoggerFactory(),
+    cache_logger_on_first_use=True,
 )
 
 logger = structlog.get_logger()
 
-# Global bot application (webhook only)
-bot_app: Application = None
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -41,9 +51,9 @@ async def lifespan(app: FastAPI):
     
     IMPORTANT: Telegram bot runs in WEBHOOK-ONLY mode.
     No polling - production-ready architecture.
+    The bot application and the webhook update queue are kept on app.state;
+    a fixed pool of workers drains the queue.
     """
-    global bot_app
-    
     # Startup
     logger.info("Starting NanoGen Backend...")
     
@@ -58,6 +68,16 @@ async def lifespan(app: FastAPI):
     
     await bot_app.initialize()
     await bot_app.start()
+    app.state.bot_app = bot_app
+    # Bound once here; the workers call it directly for every update
+    process_update = bot_app.process_update
+    
+    update_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.telegram_update_queue_size)
+    app.state.update_queue = update_queue
+    update_workers = [
+        asyncio.create_task(telegram_update_worker(update_queue, process_update))
+        for _ in range(settings.telegram_update_workers)
+    ]
     logger.info("Telegram bot initialized and started")
     
     # Set webhook (production only)
@@ -127,11 +147,23 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error("Failed to delete webhook", error=str(e))
         
+        # Let queued updates finish before the bot goes away
+        try:
+            await asyncio.wait_for(update_queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning("Update queue not drained", pending=update_queue.qsize())
+        for worker in update_workers:
+            worker.cancel()
+        await asyncio.gather(*update_workers, return_exceptions=True)
+        
         # Stop bot
         await bot_app.stop()
         await bot_app.shutdown()
+        await close_http_client()
         logger.info("Telegram bot stopped")
     
+    await cache_service.close()
+    
     logger.info("Shutdown complete")
 
 
@@ -141,6 +173,7 @@ app = FastAPI(
     version="1.0.0",
     description="NanoGen AI Generation Backend",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS Configuration
@@ -159,7 +192,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=False,  # Required: Cannot use "*" origins with credentials=True
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    allow_methods=["GET", "POST", "OPTIONS"],  # the API only routes GET/POST
     allow_headers=[
         "Content-Type",
         "Authorization",
@@ -185,36 +218,52 @@ async def cors_logging_middleware(request: Request, call_next):
         logger.debug("CORS response headers", headers=cors_headers, origin=origin)
     return response
 
+@app.exception_handler(AppError)
+async def app_error_handler(request: Request, exc: AppError):
+    return Response(
+        content=exc.to_bytes(),
+        media_type="application/json",
+        status_code=exc.http_status,
+    )
+
+
 # Include routers
 app.include_router(generation.router)
 app.include_router(user.router)
 app.include_router(admin.router)
 
 
+# Constant bodies are encoded once; the handlers skip jsonable_encoder entirely
+_ROOT_BODY = orjson.dumps({"status": "ok", "service": "NanoGen API", "version": "1.0.0"})
+_HEALTH_BODY = orjson.dumps({"status": "healthy"})
+_WEBHOOK_OK_BODY = orjson.dumps({"ok": True})
+
+
 @app.get("/")
 async def root():
-    return {"status": "ok", "service": "NanoGen API", "version": "1.0.0"}
+    return Response(_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 
 # ========== TELEGRAM WEBHOOK ENDPOINT ==========
 
 @app.post("/webhook/telegram")
-async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
+async def telegram_webhook(request: Request):
     """
     Handle Telegram webhook updates.
     
     IMPORTANT:
     - Validates update
-    - Processes in background (non-blocking)
+    - Queues it for the worker pool (non-blocking)
+    - Sheds the update when the queue is full instead of buffering without bound
     - Returns 200 immediately (Telegram requirement)
     - Has error handling to prevent update loss
     """
-    global bot_app
+    bot_app = getattr(request.app.state, "bot_app", None)
     
     if not bot_app:
         logger.error("Webhook received but bot not initialized")
@@ -222,7 +271,7 @@ async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
     
     try:
         # Parse update
-        data = await request.json()
+        data = orjson.loads(await request.body())
         update = Update.de_json(data, bot_app.bot)
         
         if not update:
@@ -231,10 +280,13 @@ async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
         
         # Process update in background (non-blocking)
         # This prevents slow handlers from blocking Telegram webhook
-        background_tasks.add_task(process_telegram_update, update)
+        try:
+            request.app.state.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Update queue full, update shed", update_id=update.update_id)
         
         # Return immediately (Telegram requires fast response)
-        return {"ok": True}
+        return Response(_WEBHOOK_OK_BODY, media_type="application/json")
         
     except Exception as e:
         # Log error but return ok=True to prevent Telegram retries
@@ -243,22 +295,24 @@ async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
             error=str(e),
             error_type=type(e).__name__,
         )
-        return {"ok": True}  # Prevent Telegram from retrying
+        # Prevent Telegram from retrying
+        return Response(_WEBHOOK_OK_BODY, media_type="application/json")
 
 
-async def process_telegram_update(update: Update):
+async def process_telegram_update(
+    update: Update,
+    process_update: Callable[[Update], Awaitable[None]],
+):
     """
-    Process Telegram update in background.
+    Process one Telegram update on a queue worker.
     
     Separated from webhook endpoint to:
     - Return fast response to Telegram
     - Handle errors without losing updates
     - Isolate slow operations
     """
-    global bot_app
-    
     try:
-        await bot_app.process_update(update)
+        await process_update(update)
     except Exception as e:
         logger.error(
             "Update processing failed",
@@ -270,6 +324,19 @@ async def process_telegram_update(update: Update):
         # Update is considered processed (no retry)
 
 
+async def telegram_update_worker(
+    queue: asyncio.Queue,
+    process_update: Callable[[Update], Awaitable[None]],
+):
+    """Drain the webhook update queue for the lifetime of the app."""
+    while True:
+        update = await queue.get()
+        try:
+            await process_telegram_update(update, process_update)
+        finally:
+            queue.task_done()
+
+
 if __name__ == "__main__":
     import uvicorn
     import os
@@ -280,4 +347,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=port,
         reload=settings.debug,
+        loop="uvloop",
+        http="httptools",
     )
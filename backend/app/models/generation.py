@@ -1,5 +1,5 @@
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Enum as SQLEnum
-from sqlalchemy.sql import func
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Index, Enum as SQLEnum
+from sqlalchemy.sql import func, text
 from app.database import Base
 import enum
 
@@ -14,9 +14,21 @@ class GenerationStatus(str, enum.Enum):
 
 class Generation(Base):
     __tablename__ = "generations"
+    __table_args__ = (
+        # One active generation per (user, idempotency key); finished ones can be retried
+        Index(
+            "uq_generations_active_idempotency",
+            "user_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=text(
+                "idempotency_key IS NOT NULL AND status IN ('PENDING', 'PROCESSING')"
+            ),
+        ),
+    )
     
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    user_id = Column(BigInteger, index=True, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
     
     # Model info
     model_id = Column(String(100), nullable=False)  # e.g., "kling-video/v2.0/master/text-to-video"
@@ -40,7 +52,7 @@ class Generation(Base):
     credits_charged = Column(Integer, default=0)
     
     # Idempotency (duplicate protection)
-    idempotency_key = Column(String(64), nullable=True, index=True)
+    idempotency_key = Column(String(64), nullable=True)
     
     # Timeout tracking
     timeout_at = Column(DateTime(timezone=True), nullable=True)
@@ -49,3 +61,13 @@ class Generation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# History: per user, newest first, (created_at, id) keyset cursor.
+# Declared on the mapped columns so the DESC ordering matches migration 007.
+Index(
+    "ix_generations_user_created",
+    Generation.user_id,
+    Generation.created_at.desc(),
+    Generation.id.desc(),
+)
@@ -1,7 +1,7 @@
 """
 Payment Model for top-up requests
 """
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -48,3 +48,7 @@ class Payment(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Admin pending queue: WHERE status ... ORDER BY created_at DESC (migration 004)
+Index("ix_payments_status_created", Payment.status, Payment.created_at.desc())
@@ -1,15 +1,24 @@
 """
 User Model with full referral program support
 """
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Boolean
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Unique, and covers the code -> referrer id lookup
+        Index(
+            "ix_users_referral_code_covering",
+            "referral_code",
+            unique=True,
+            postgresql_include=["id"],
+        ),
+    )
     
-    id = Column(BigInteger, primary_key=True, index=True)  # Telegram user ID
+    id = Column(BigInteger, primary_key=True)  # Telegram user ID
     username = Column(String(255), nullable=True)
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
@@ -23,7 +32,7 @@ class User(Base):
     referrer_id = Column(BigInteger, nullable=True, index=True)
     
     # User's own referral code (auto-generated)
-    referral_code = Column(String(32), unique=True, nullable=True)
+    referral_code = Column(String(32), nullable=True)
     
     # Partner earnings (in UZS)
     referral_total_earned = Column(Integer, default=0)    # Lifetime total earned
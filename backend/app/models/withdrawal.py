@@ -1,7 +1,7 @@
 """
 Withdrawal Model for partner program payouts
 """
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Text, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -50,3 +50,7 @@ class Withdrawal(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Admin pending queue: WHERE status ... ORDER BY created_at DESC (migration 004)
+Index("ix_withdrawals_status_created", Withdrawal.status, Withdrawal.created_at.desc())
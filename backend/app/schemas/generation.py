@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
@@ -12,7 +12,8 @@ class GenerationType(str, Enum):
 class GenerationRequest(BaseModel):
     """Request from Web App to start generation"""
     user_id: int
-    init_data: str  # Telegram WebApp init data for verification
+    # Legacy: auth now uses the verified X-Telegram-Init-Data header
+    init_data: Optional[str] = None
     
     model_id: str
     model_name: str
@@ -42,6 +43,21 @@ class GenerationResponse(BaseModel):
     estimated_time: Optional[int] = None  # seconds
 
 
+class GenerationHistoryItem(BaseModel):
+    id: int
+    model_name: str
+    prompt: str  # first 100 chars, "..." appended if longer
+    status: str
+    credits_charged: int
+    created_at: datetime
+    result_url: Optional[str] = None
+
+
+class GenerationHistoryPage(BaseModel):
+    items: List[GenerationHistoryItem]
+    total: int
+
+
 class GenerationResult(BaseModel):
     id: int
     user_id: int
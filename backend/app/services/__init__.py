@@ -8,6 +8,7 @@ from app.services.aiml import aiml_client
 from app.services.telegram import telegram_service
 from app.services.referral import referral_service
 from app.services.payment import payment_service
+from app.services.cache import cache_service
 
 __all__ = [
     "user_service",
@@ -17,4 +18,5 @@ __all__ = [
     "telegram_service",
     "referral_service",
     "payment_service",
+    "cache_service",
 ]
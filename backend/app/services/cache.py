@@ -0,0 +1,61 @@
+"""
+Redis cache service.
+
+Best effort: if Redis is down or slow, reads behave like a miss and writes are
+dropped, so callers always fall through to the database.
+"""
+import json
+from typing import Any, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+import structlog
+
+logger = structlog.get_logger()
+
+
+class CacheService:
+    def __init__(self):
+        self._redis: Optional[redis.Redis] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        # Created lazily so importing the module never opens a connection
+        if self._redis is None:
+            self._redis = redis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+        return self._redis
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.client.get(key)
+        except RedisError as e:
+            logger.warning("Cache read failed", key=key, error=str(e))
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: int, nx: bool = False) -> None:
+        # nx: only write if the key does not exist yet (first writer wins)
+        try:
+            await self.client.set(key, json.dumps(value), ex=ttl, nx=nx)
+        except RedisError as e:
+            logger.warning("Cache write failed", key=key, error=str(e))
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.client.delete(*keys)
+        except RedisError as e:
+            logger.warning("Cache delete failed", keys=keys, error=str(e))
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+cache_service = CacheService()
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, func, and_
+from sqlalchemy.exc import IntegrityError
 
 from app.models import User, Generation, GenerationStatus, Transaction, TransactionType
 from app.schemas.generation import GenerationRequest, GenerationType
@@ -116,32 +117,32 @@ class GenerationService:
         if recent_count >= RATE_LIMIT_PER_MINUTE:
             raise RateLimitError(retry_after=60)
     
-    async def check_idempotency(
+    async def has_active_duplicate(
         self,
         db: AsyncSession,
         user_id: int,
         idempotency_key: Optional[str],
-    ) -> Optional[Generation]:
+    ) -> bool:
         """
-        Check if this is a duplicate request.
-        Returns existing generation if duplicate, None otherwise.
+        Check for an active (PENDING/PROCESSING) generation with this key.
         
-        Only checks for active generations (PENDING/PROCESSING).
-        CANCELLED/FAILED/COMPLETED generations can be retried with same key.
+        Served by the partial unique index. Only a fast path so retries skip
+        the image upload; the index itself still rejects racing inserts.
         """
         if not idempotency_key:
-            return None
-        
-        stmt = select(Generation).where(
-            Generation.user_id == user_id,
-            Generation.idempotency_key == idempotency_key,
-            Generation.status.in_([
-                GenerationStatus.PENDING,
-                GenerationStatus.PROCESSING,
-            ]),
+            return False
+        
+        existing_id = await db.scalar(
+            select(Generation.id).where(
+                Generation.user_id == user_id,
+                Generation.idempotency_key == idempotency_key,
+                Generation.status.in_([
+                    GenerationStatus.PENDING,
+                    GenerationStatus.PROCESSING,
+                ]),
+            ).limit(1)
         )
-        result = await db.execute(stmt)
-        return result.scalar_one_or_none()
+        return existing_id is not None
     
     # ========== MAIN FLOW ==========
     
@@ -156,9 +157,9 @@ class GenerationService:
         
         ATOMIC FLOW:
         1. Validate user and limits
-        2. Check idempotency
+        2. Check idempotency (before any upload)
         3. Atomic credit deduction (with race protection)
-        4. Create generation record
+        4. Create generation record (racing duplicates rejected by the DB)
         5. Return immediately
         
         Background processing happens separately.
@@ -176,11 +177,15 @@ class GenerationService:
         await self.check_limits(db, user.id)
         
         # 3. CHECK IDEMPOTENCY
-        if idempotency_key:
-            existing = await self.check_idempotency(db, user.id, idempotency_key)
-            if existing:
-                logger.info("Duplicate request detected", generation_id=existing.id)
-                raise DuplicateRequestError()
+        # Cheap pre-check so a retry never uploads an image it won't use;
+        # the partial unique index remains the backstop for concurrent submits
+        if await self.has_active_duplicate(db, user.id, idempotency_key):
+            logger.info(
+                "Duplicate request detected",
+                user_id=user.id,
+                idempotency_key=idempotency_key,
+            )
+            raise DuplicateRequestError()
         
         # 4. CALCULATE PRICE
         price = MODEL_PRICES.get(request.model_id, 10)
@@ -227,7 +232,20 @@ class GenerationService:
         )
         db.add(generation)
 
-        await db.commit()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent submit with the same key won the insert.
+            # The rollback expires `user`, so log the id from the request.
+            await db.rollback()
+            if not idempotency_key:
+                raise
+            logger.info(
+                "Duplicate request detected",
+                user_id=request.user_id,
+                idempotency_key=idempotency_key,
+            )
+            raise DuplicateRequestError()
         
         logger.info(
             "Generation created",
@@ -237,7 +255,7 @@ class GenerationService:
             price=price,
         )
         
-        # 8. RETURN RESPONSE
+        # 7. RETURN RESPONSE
         estimated_time = GENERATION_TIMES.get(request.model_id, 120)
         
         return {
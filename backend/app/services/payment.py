@@ -6,7 +6,7 @@ import hashlib
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_
 
 from app.models import User, Payment, PaymentStatus, Withdrawal, WithdrawalStatus, CardType
 from app.config import settings
@@ -95,6 +95,20 @@ class PaymentService:
             "is_duplicate": False,
         }
     
+    async def set_payment_message_id(
+        self,
+        db: AsyncSession,
+        payment_id: int,
+        message_id: Optional[int],
+    ) -> None:
+        """Store the admin channel message id with a single UPDATE by PK"""
+        await db.execute(
+            update(Payment)
+            .where(Payment.id == payment_id)
+            .values(telegram_message_id=message_id)
+        )
+        await db.commit()
+    
     async def confirm_topup(
         self,
         db: AsyncSession,
@@ -136,6 +150,10 @@ class PaymentService:
             )
             if commission_info:
                 payment.referral_commission = commission_info["commission"]
+                # For the referrer's notification, so callers needn't reload the user
+                commission_info["referred_name"] = (
+                    user.first_name or user.username or f"User #{user.id}"
+                )
         
         await db.commit()
         
@@ -163,30 +181,38 @@ class PaymentService:
         reason: str = "Payment not received",
     ) -> Dict[str, Any]:
         """Reject top-up (admin action)"""
-        payment = await db.get(Payment, payment_id)
-        if not payment:
-            raise ValueError("Payment not found")
-        
-        if payment.status != PaymentStatus.PENDING:
-            raise ValueError(f"Payment already processed: {payment.status.value}")
-        
-        payment.status = PaymentStatus.REJECTED
-        payment.admin_id = admin_id
-        payment.admin_message = reason
-        payment.processed_at = datetime.utcnow()
+        # Single conditional UPDATE: the status precondition is enforced
+        # atomically, so two admins cannot both process the same payment
+        stmt = (
+            update(Payment)
+            .where(
+                Payment.id == payment_id,
+                Payment.status == PaymentStatus.PENDING,
+            )
+            .values(
+                status=PaymentStatus.REJECTED,
+                admin_id=admin_id,
+                admin_message=reason,
+                processed_at=datetime.utcnow(),
+            )
+            .returning(Payment.user_id)
+        )
+        user_id = (await db.execute(stmt)).scalar_one_or_none()
+        if user_id is None:
+            raise await self._not_pending_error(db, Payment, payment_id)
         
         await db.commit()
         
         logger.info(
             "Top-up rejected",
             payment_id=payment_id,
-            user_id=payment.user_id,
+            user_id=user_id,
             admin_id=admin_id,
             reason=reason,
         )
         
         return {
-            "user_id": payment.user_id,
+            "user_id": user_id,
             "reason": reason,
         }
     
@@ -283,6 +309,20 @@ class PaymentService:
             "status": "frozen",
         }
     
+    async def set_withdrawal_message_id(
+        self,
+        db: AsyncSession,
+        withdrawal_id: int,
+        message_id: Optional[int],
+    ) -> None:
+        """Store the admin channel message id with a single UPDATE by PK"""
+        await db.execute(
+            update(Withdrawal)
+            .where(Withdrawal.id == withdrawal_id)
+            .values(telegram_message_id=message_id)
+        )
+        await db.commit()
+    
     async def confirm_withdrawal(
         self,
         db: AsyncSession,
@@ -293,37 +333,45 @@ class PaymentService:
         Confirm withdrawal (admin action).
         Marks as paid, updates withdrawn total.
         """
-        withdrawal = await db.get(Withdrawal, withdrawal_id)
-        if not withdrawal:
-            raise ValueError("Withdrawal not found")
-        
-        if withdrawal.status not in [WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]:
-            raise ValueError(f"Withdrawal already processed: {withdrawal.status.value}")
-        
-        user = await db.get(User, withdrawal.user_id)
-        if not user:
-            raise ValueError("User not found")
-        
-        # Update withdrawal
-        withdrawal.status = WithdrawalStatus.APPROVED
-        withdrawal.admin_id = admin_id
-        withdrawal.processed_at = datetime.utcnow()
+        stmt = (
+            update(Withdrawal)
+            .where(
+                Withdrawal.id == withdrawal_id,
+                Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]),
+            )
+            .values(
+                status=WithdrawalStatus.APPROVED,
+                admin_id=admin_id,
+                processed_at=datetime.utcnow(),
+            )
+            .returning(Withdrawal.user_id, Withdrawal.amount_uzs)
+        )
+        withdrawal = (await db.execute(stmt)).one_or_none()
+        if withdrawal is None:
+            raise await self._not_pending_error(db, Withdrawal, withdrawal_id)
         
         # Update user stats
-        user.referral_withdrawn += withdrawal.amount_uzs
+        user_id = await db.scalar(
+            update(User)
+            .where(User.id == withdrawal.user_id)
+            .values(referral_withdrawn=User.referral_withdrawn + withdrawal.amount_uzs)
+            .returning(User.id)
+        )
+        if user_id is None:
+            raise ValueError("User not found")
         
         await db.commit()
         
         logger.info(
             "Withdrawal confirmed",
             withdrawal_id=withdrawal_id,
-            user_id=user.id,
+            user_id=user_id,
             amount_uzs=withdrawal.amount_uzs,
             admin_id=admin_id,
         )
         
         return {
-            "user_id": user.id,
+            "user_id": user_id,
             "amount_uzs": withdrawal.amount_uzs,
         }
     
@@ -338,43 +386,58 @@ class PaymentService:
         Reject withdrawal (admin action).
         Returns frozen amount to user's balance.
         """
-        withdrawal = await db.get(Withdrawal, withdrawal_id)
-        if not withdrawal:
-            raise ValueError("Withdrawal not found")
-        
-        if withdrawal.status not in [WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]:
-            raise ValueError(f"Withdrawal already processed: {withdrawal.status.value}")
-        
-        user = await db.get(User, withdrawal.user_id)
-        if not user:
-            raise ValueError("User not found")
+        stmt = (
+            update(Withdrawal)
+            .where(
+                Withdrawal.id == withdrawal_id,
+                Withdrawal.status.in_([WithdrawalStatus.PENDING, WithdrawalStatus.FROZEN]),
+            )
+            .values(
+                status=WithdrawalStatus.REJECTED,
+                admin_id=admin_id,
+                admin_message=reason,
+                processed_at=datetime.utcnow(),
+            )
+            .returning(Withdrawal.user_id, Withdrawal.amount_uzs)
+        )
+        withdrawal = (await db.execute(stmt)).one_or_none()
+        if withdrawal is None:
+            raise await self._not_pending_error(db, Withdrawal, withdrawal_id)
         
         # Return frozen amount
-        user.referral_balance += withdrawal.amount_uzs
-        
-        # Update withdrawal
-        withdrawal.status = WithdrawalStatus.REJECTED
-        withdrawal.admin_id = admin_id
-        withdrawal.admin_message = reason
-        withdrawal.processed_at = datetime.utcnow()
+        user_id = await db.scalar(
+            update(User)
+            .where(User.id == withdrawal.user_id)
+            .values(referral_balance=User.referral_balance + withdrawal.amount_uzs)
+            .returning(User.id)
+        )
+        if user_id is None:
+            raise ValueError("User not found")
         
         await db.commit()
         
         logger.info(
             "Withdrawal rejected",
             withdrawal_id=withdrawal_id,
-            user_id=user.id,
+            user_id=user_id,
             amount_uzs=withdrawal.amount_uzs,
             admin_id=admin_id,
             reason=reason,
         )
         
         return {
-            "user_id": user.id,
+            "user_id": user_id,
             "amount_uzs": withdrawal.amount_uzs,
             "reason": reason,
         }
     
+    async def _not_pending_error(self, db: AsyncSession, model, entity_id: int) -> ValueError:
+        """Explain why a conditional status UPDATE matched no row"""
+        status = await db.scalar(select(model.status).where(model.id == entity_id))
+        if status is None:
+            return ValueError(f"{model.__name__} not found")
+        return ValueError(f"{model.__name__} already processed: {status.value}")
+    
     # ========== CREDIT PACKAGES ==========
     
     def get_credit_packages(self) -> list:
@@ -169,7 +169,13 @@ class ReferralService:
         db: AsyncSession,
         user_id: int,
     ) -> Dict[str, Any]:
-        """Get partner program statistics for user"""
+        """
+        Get partner program statistics for user.
+        
+        Every figure is a counter kept on the users row and updated on write
+        (process_referral / process_commission / withdrawals), so this is a
+        read of a row the auth dependency has already loaded - no aggregation.
+        """
         user = await db.get(User, user_id)
         if not user:
             raise ValueError("User not found")
@@ -208,25 +214,32 @@ class ReferralService:
         limit: int = 50,
     ) -> list:
         """Get list of user's referrals"""
+        # Only the columns the list shows; no ORM entities to hydrate
         stmt = (
-            select(Referral, User)
+            select(
+                Referral.referred_id,
+                Referral.total_earned,
+                Referral.created_at,
+                User.first_name,
+                User.username,
+                User.first_payment_at.is_not(None).label("is_active"),
+            )
             .join(User, User.id == Referral.referred_id)
             .where(Referral.referrer_id == user_id)
             .order_by(Referral.created_at.desc())
             .limit(limit)
         )
         result = await db.execute(stmt)
-        rows = result.all()
         
         return [
             {
-                "id": referral.referred_id,
-                "name": user.first_name or user.username or f"User {user.id}",
-                "is_active": user.first_payment_at is not None,
-                "total_earned": referral.total_earned,
-                "joined_at": referral.created_at.isoformat(),
+                "id": row.referred_id,
+                "name": row.first_name or row.username or f"User {row.referred_id}",
+                "is_active": row.is_active,
+                "total_earned": row.total_earned,
+                "joined_at": row.created_at.isoformat(),
             }
-            for referral, user in rows
+            for row in result
         ]
 
 
@@ -9,15 +9,23 @@ from telegram.constants import ParseMode
 from io import BytesIO
 import base64
 import hmac
+import json
 import hashlib
 from urllib.parse import parse_qsl
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from cachetools import TTLCache
 
 from app.config import settings
 import structlog
 
 logger = structlog.get_logger()
 
+# The same signed init_data is sent with every WebApp request; remember the
+# verdict for a few minutes instead of re-parsing and re-hashing it
+INIT_DATA_CACHE_SIZE = 10_000
+INIT_DATA_CACHE_TTL = 300  # seconds
+
 
 class TelegramService:
     """Service for interacting with Telegram"""
@@ -27,6 +35,16 @@ class TelegramService:
         self.webapp_url = settings.webapp_url
         self.admin_channel_id = settings.telegram_admin_channel_id
         self.bot_token = settings.telegram_bot_token
+        # WebApp secret depends only on the bot token - derive it once
+        self._webapp_secret_key = hmac.new(
+            b"WebAppData",
+            self.bot_token.encode(),
+            hashlib.sha256,
+        ).digest()
+        # sha256(init_data) -> (signature valid, user id in payload)
+        self._init_data_cache: TTLCache = TTLCache(
+            maxsize=INIT_DATA_CACHE_SIZE, ttl=INIT_DATA_CACHE_TTL
+        )
     
     def verify_init_data(self, init_data: str, user_id: Optional[int] = None) -> bool:
         """
@@ -47,6 +65,25 @@ class TelegramService:
         Returns:
             True if signature is valid, False otherwise
         """
+        key = hashlib.sha256(init_data.encode()).digest()
+        verdict = self._init_data_cache.get(key)
+        if verdict is None:
+            verdict = self._check_init_data(init_data)
+            self._init_data_cache[key] = verdict
+        
+        is_valid, parsed_user_id = verdict
+        if not is_valid:
+            return False
+        
+        # Verify user_id if provided
+        if user_id is not None and parsed_user_id is not None and parsed_user_id != user_id:
+            logger.warning("User ID mismatch", expected=user_id, got=parsed_user_id)
+            return False
+        
+        return True
+    
+    def _check_init_data(self, init_data: str) -> Tuple[bool, Optional[int]]:
+        """Check the signature; returns (is_valid, user id from the payload)"""
         try:
             # Parse init_data
             parsed = dict(parse_qsl(init_data))
@@ -55,22 +92,17 @@ class TelegramService:
             provided_hash = parsed.pop('hash', None)
             if not provided_hash:
                 logger.warning("No hash in init_data")
-                return False
+                return False, None
             
-            # Verify user_id if provided
-            if user_id is not None:
-                parsed_user_id = parsed.get('user')
-                if parsed_user_id:
-                    # user is JSON string, parse it
-                    import json
-                    try:
-                        user_data = json.loads(parsed_user_id)
-                        if user_data.get('id') != user_id:
-                            logger.warning("User ID mismatch", expected=user_id, got=user_data.get('id'))
-                            return False
-                    except json.JSONDecodeError:
-                        logger.warning("Invalid user JSON in init_data")
-                        return False
+            parsed_user_id = None
+            user_str = parsed.get('user')
+            if user_str:
+                # user is JSON string, parse it
+                try:
+                    parsed_user_id = json.loads(user_str).get('id')
+                except json.JSONDecodeError:
+                    logger.warning("Invalid user JSON in init_data")
+                    return False, None
             
             # Create data_check_string (sorted alphabetically)
             data_check_string = '\n'.join(
@@ -78,16 +110,9 @@ class TelegramService:
                 for key, value in sorted(parsed.items())
             )
             
-            # Create secret_key
-            secret_key = hmac.new(
-                "WebAppData".encode(),
-                self.bot_token.encode(),
-                hashlib.sha256
-            ).digest()
-            
-            # Calculate hash
+            # Calculate hash (secret_key is precomputed in __init__)
             calculated_hash = hmac.new(
-                secret_key,
+                self._webapp_secret_key,
                 data_check_string.encode(),
                 hashlib.sha256
             ).hexdigest()
@@ -98,11 +123,11 @@ class TelegramService:
             if not is_valid:
                 logger.warning("Invalid init_data signature")
             
-            return is_valid
+            return is_valid, parsed_user_id
             
         except Exception as e:
             logger.error("Error verifying init_data", error=str(e), error_type=type(e).__name__)
-            return False
+            return False, None
     
     def extract_user_from_init_data(self, init_data: str) -> Optional[Dict[str, Any]]:
         """
@@ -117,7 +142,6 @@ class TelegramService:
             if not user_str:
                 return None
             
-            import json
             return json.loads(user_str)
         except Exception as e:
             logger.error("Error extracting user from init_data", error=str(e))
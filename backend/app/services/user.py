@@ -2,10 +2,11 @@
 User Service
 """
 import secrets
-from datetime import datetime
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 
 from app.models import User, Referral
 from app.schemas.user import TelegramUser
@@ -17,28 +18,34 @@ logger = structlog.get_logger()
 class UserService:
     """Handles user operations"""
     
-    async def get_or_create_user(
+    async def auth_upsert(
         self,
         db: AsyncSession,
         telegram_user: TelegramUser,
         referral_code: Optional[str] = None,
     ) -> User:
         """
-        Get existing user or create new one
-        """
-        user = await db.get(User, telegram_user.id)
+        Get-or-create the user and link the referrer in one transaction.
         
-        if user:
-            # Update user info
-            user.username = telegram_user.username
-            user.first_name = telegram_user.first_name
-            user.last_name = telegram_user.last_name
-            user.last_active_at = datetime.utcnow()
-            await db.commit()
-            return user
+        The user row is upserted (INSERT ... ON CONFLICT DO UPDATE) with the
+        referrer resolved from the code inside the same statement, so a login
+        is one round-trip plus the commit. Linking an existing user who has no
+        referrer yet takes one more conditional UPDATE.
+        """
+        referrer_id = None
+        if referral_code:
+            # Alias: the subquery must not correlate with the outer users row
+            referrer = aliased(User)
+            referrer_id = (
+                select(referrer.id)
+                .where(
+                    referrer.referral_code == referral_code,
+                    referrer.id != telegram_user.id,  # no self-referral
+                )
+                .scalar_subquery()
+            )
         
-        # Create new user
-        user = User(
+        stmt = pg_insert(User).values(
             id=telegram_user.id,
             username=telegram_user.username,
             first_name=telegram_user.first_name,
@@ -46,48 +53,62 @@ class UserService:
             language_code=telegram_user.language_code or "ru",
             credits=10,  # Welcome bonus
             referral_code=self._generate_referral_code(),
+            referrer_id=referrer_id,
         )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={
+                "username": stmt.excluded.username,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+                "last_active_at": func.now(),
+            },
+        ).returning(User, literal_column("xmax = 0").label("created"))
         
-        # Process referral
-        if referral_code:
-            referrer = await self._get_user_by_referral_code(db, referral_code)
-            if referrer and referrer.id != telegram_user.id:
-                user.referrer_id = referrer.id
-                
-                # Create referral record
-                referral = Referral(
-                    referrer_id=referrer.id,
-                    referred_id=telegram_user.id,
-                )
-                db.add(referral)
-                
-                logger.info(
-                    "Referral registered",
-                    referrer_id=referrer.id,
-                    referred_id=telegram_user.id,
-                )
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        user, created = result.one()
+        
+        linked_referrer_id = None
+        if created:
+            linked_referrer_id = user.referrer_id
+        elif referral_code and user.referrer_id is None:
+            # Existing user without a referrer (set once, never changes)
+            linked_referrer_id = await db.scalar(
+                update(User)
+                .where(User.id == user.id, User.referrer_id.is_(None))
+                .values(referrer_id=referrer_id)
+                .returning(User.referrer_id)
+            )
+        
+        if linked_referrer_id is not None:
+            db.add(Referral(
+                referrer_id=linked_referrer_id,
+                referred_id=user.id,
+                total_earned=0,
+            ))
+            await db.execute(
+                update(User)
+                .where(User.id == linked_referrer_id)
+                # Rows older than migration 002 may still hold NULL here
+                .values(referrals_count=func.coalesce(User.referrals_count, 0) + 1)
+            )
+            logger.info(
+                "Referral linked",
+                referrer_id=linked_referrer_id,
+                referred_id=user.id,
+            )
         
-        db.add(user)
         await db.commit()
         
-        logger.info(
-            "New user created",
-            user_id=telegram_user.id,
-            username=telegram_user.username,
-        )
+        if created:
+            logger.info(
+                "New user created",
+                user_id=user.id,
+                username=user.username,
+            )
         
         return user
     
-    async def _get_user_by_referral_code(
-        self,
-        db: AsyncSession,
-        code: str,
-    ) -> Optional[User]:
-        """Find user by referral code"""
-        stmt = select(User).where(User.referral_code == code)
-        result = await db.execute(stmt)
-        return result.scalar_one_or_none()
-    
     def _generate_referral_code(self) -> str:
         """Generate unique referral code"""
         return secrets.token_urlsafe(8)
@@ -102,22 +123,24 @@ class UserService:
         if not user:
             raise ValueError("User not found")
         
-        # Count referrals
-        stmt = select(Referral).where(Referral.referrer_id == user_id)
+        # Count referrals and active referrals (those who made at least one
+        # generation) in a single JOIN instead of one lookup per referral
+        stmt = (
+            select(
+                func.count(Referral.id),
+                func.count(User.id).filter(User.total_generations > 0),
+            )
+            .select_from(Referral)
+            .outerjoin(User, User.id == Referral.referred_id)
+            .where(Referral.referrer_id == user_id)
+        )
         result = await db.execute(stmt)
-        referrals = result.scalars().all()
-        
-        # Count active referrals (those who made at least one generation)
-        active_count = 0
-        for ref in referrals:
-            referred_user = await db.get(User, ref.referred_id)
-            if referred_user and referred_user.total_generations > 0:
-                active_count += 1
+        total_count, active_count = result.one()
         
         return {
             "referral_code": user.referral_code,
             "referral_link": f"https://t.me/nanogenprobot?start=ref_{user.id}",
-            "total_referrals": len(referrals),
+            "total_referrals": total_count,
             "active_referrals": active_count,
             "total_earnings": user.referral_total_earned,
             "available_balance": user.referral_balance,
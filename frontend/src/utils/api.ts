@@ -206,6 +206,34 @@ export const adminAPI = {
     created_at: string;
   }>>(`/api/admin/withdrawals/pending?admin_id=${adminId}`),
   
+  getDashboard: (adminId: number) => fetchAPI<{
+    stats: {
+      total_users: number;
+      active_users: number;
+      pending_payments: number;
+      pending_withdrawals: number;
+      total_revenue_uzs: number;
+      total_payouts_uzs: number;
+    };
+    pending_payments: Array<{
+      id: number;
+      user_id: number;
+      amount_uzs: number;
+      credits: number;
+      screenshot_url?: string;
+      created_at: string;
+    }>;
+    pending_withdrawals: Array<{
+      id: number;
+      user_id: number;
+      amount_uzs: number;
+      card_number: string;
+      card_type?: string;
+      status: string;
+      created_at: string;
+    }>;
+  }>(`/api/admin/dashboard?admin_id=${adminId}`),
+  
   approvePayment: (data: { payment_id: number; admin_id: number }) => 
     fetchAPI<{ status: string; user_id: number; credits: number }>('/api/admin/payment/action', {
       method: 'POST',
@@ -61,11 +61,12 @@ export const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
     }
 
     try {
-      // Try to fetch stats - if successful, user is admin
-      const statsData = await adminAPI.getStats(userData.userId);
+      // Try to fetch dashboard - if successful, user is admin
+      const dashboard = await adminAPI.getDashboard(userData.userId);
       setIsAuthorized(true);
-      setStats(statsData);
-      loadData(userData.userId);
+      setStats(dashboard.stats);
+      setPayments(dashboard.pending_payments);
+      setWithdrawals(dashboard.pending_withdrawals);
     } catch (err: any) {
       console.error('Admin auth failed:', err);
       setIsAuthorized(false);
@@ -77,12 +78,10 @@ export const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
 
   const loadData = async (adminId: number) => {
     try {
-      const [paymentsData, withdrawalsData] = await Promise.all([
-        adminAPI.getPendingPayments(adminId),
-        adminAPI.getPendingWithdrawals(adminId),
-      ]);
-      setPayments(paymentsData);
-      setWithdrawals(withdrawalsData);
+      const dashboard = await adminAPI.getDashboard(adminId);
+      setStats(dashboard.stats);
+      setPayments(dashboard.pending_payments);
+      setWithdrawals(dashboard.pending_withdrawals);
     } catch (err: any) {
       console.error('Failed to load admin data:', err);
       setError('Ошибка загрузки данных');
@@ -105,8 +104,6 @@ export const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
       
       // Reload data
       await loadData(userData.userId);
-      const statsData = await adminAPI.getStats(userData.userId);
-      setStats(statsData);
     } catch (err: any) {
       console.error('Payment action failed:', err);
       triggerNotification('error');
@@ -129,8 +126,6 @@ export const AdminView: React.FC<AdminViewProps> = ({ onBack }) => {
       
       // Reload data
       await loadData(userData.userId);
-      const statsData = await adminAPI.getStats(userData.userId);
-      setStats(statsData);
     } catch (err: any) {
       console.error('Withdrawal action failed:', err);
       triggerNotification('error');